@@ -0,0 +1,16 @@
+""" gunicorn settings, loaded with --config python:asksniff.gunicorn_conf (see the Procfile) """
+import os
+
+def post_fork(server, worker):
+    # pylint: disable=W0613
+    """ fill the in-memory caches of each worker before it serves requests when WARM_CACHES_ON_BOOT
+    is set. A worker which cannot warm up after a few attempts loads the content on its first
+    requests instead (see warmup.warm_on_boot) """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "asksniff.settings")
+    import django
+    django.setup()
+    from django.conf import settings
+    if not settings.WARM_CACHES_ON_BOOT:
+        return
+    from iPoorly.warmup import warm_on_boot
+    warm_on_boot(report=worker.log.info, report_failure=worker.log.exception)
@@ -47,10 +47,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'iPoorly.middleware.ThrottledSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'iPoorly.middleware.ActiveChildMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -69,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'iPoorly.context_processors.roles',
             ],
         },
     },
@@ -98,6 +100,22 @@ CACHES = {
     }
 }
 
+# versioned content caches are made stale by iPoorly.signals, so they can be kept for a long time
+CONTENT_CACHE_TIMEOUT = config('CONTENT_CACHE_TIMEOUT', default=60*60*24*7, cast=int)
+
+# 'index' searches an in-process index, 'postgres' uses postgres full text search (only on
+# postgres, other databases use the index). See iPoorly/search_backends.py
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='index')
+
+# show the changes made by the editors as soon as they are saved. When off the changes are a draft
+# until an editor publishes them from the admin page, see iPoorly/content.py
+CONTENT_AUTO_PUBLISH = config('CONTENT_AUTO_PUBLISH', default=True, cast=bool)
+
+# fill the caches of each gunicorn worker before it serves requests, see asksniff/gunicorn_conf.py.
+# Searches warmed besides the symptom names, as a comma separated list
+WARM_CACHES_ON_BOOT = config('WARM_CACHES_ON_BOOT', default=False, cast=bool)
+WARM_SEARCH_QUERIES = config('WARM_SEARCH_QUERIES', default='', cast=Csv())
+
 
 
 
@@ -152,7 +170,7 @@ AZURE_ACCOUNT_KEY = config('AZURE_STORAGE_KEY')
 REDACTOR_OPTIONS = {'lang':'en', 'buttons':['format', 'bold', 'italic', 'deleted', 'lists', 'image', 'file', 'link', 'horizontalrule', 'underline']\
                     , 'plugins':['video', 'table', 'fontsize', 'fontcolor', 'fontfamily', 'source', 'alignment', 'definedlinks', 'fullscreen',\
                     'inlinestyle'], 'script':'false', 'overrideStyles': 'false', 'keepInlineOnEnter':'true', 'include_jquery':'false',\
-                    'definedLinks': '/static/defined-links.json',}
+                    'definedLinks': '/links/defined/',}
 REDACTOR_UPLOAD = 'uploads/'
 REDACTOR_UPLOAD_HANDLER = 'redactor.handlers.UUIDUploader'
 REDACTOR_AUTH_DECORATOR = 'django.contrib.auth.decorators.login_required'
@@ -162,7 +180,13 @@ LOGIN_URL = reverse_lazy('index')
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_AGE = 20 * 60 # max 20 min inactivity
-SESSION_SAVE_EVERY_REQUEST = True
+# the expiry of a session slides on every request but an unchanged session is only written to
+# the database once every SESSION_REFRESH_INTERVAL seconds, see iPoorly/middleware.py
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = config('SESSION_REFRESH_INTERVAL', default=5 * 60, cast=int)
+# anonymous sessions which only hold the disclaimer and age flags are kept in a signed cookie,
+# all other sessions in the database with memcached in front, see iPoorly/session_store.py
+SESSION_ENGINE = 'iPoorly.session_store'
 
 if config('PRODUCTION', cast=bool):
     DATABASES['default'].update(dj_database_url.config(conn_max_age=500))
@@ -43,4 +43,33 @@ function delete_symptom(symptom_id){
       });
   }
 
-  
\ No newline at end of file
+  
+// the edit forms are only loaded when a symptom is edited, the fields are
+// kept so that opening the same symptom again does not fetch them twice
+var symptom_forms = {};
+
+function show_symptom_form(symptom_id, html){
+    var fields = $("#edit_symptom_fields");
+    fields.html(html);
+    $("#edit_symptom_id").val(symptom_id);
+    fields.find("textarea.redactor-box").trigger("redactor:init");
+    Materialize.updateTextFields();
+    $("#edit_symptom_modal").modal("open");
+}
+
+function edit_symptom(url, symptom_id){
+    if(symptom_forms.hasOwnProperty(symptom_id)){
+        show_symptom_form(symptom_id, symptom_forms[symptom_id]);
+        return;
+    }
+    $.ajax({
+          url : url, // the endpoint
+          type : "GET", // http method
+
+          // handle a successful response
+          success : function(html) {
+              symptom_forms[symptom_id] = html;
+              show_symptom_form(symptom_id, html);
+          },
+      });
+}
@@ -0,0 +1,70 @@
+// the diary is loaded a page at a time as the parent scrolls, and the edit form
+// of an entry is only loaded when it is edited
+var loading_logs = false;
+
+function load_logs(){
+    var logs = $("#logs");
+    var next = logs.data("next");
+    if(loading_logs || !next){
+        return;
+    }
+    loading_logs = true;
+    $.ajax({
+          url : logs.data("url"), // the endpoint
+          type : "GET", // http method
+          data : { after : next },
+
+          // handle a successful response
+          success : function(json) {
+              if(json["status"] == "1"){
+                logs.append(json["html"]);
+                logs.data("next", json["next"] || "");
+                logs.find(".materialboxed").not(".initialized").materialbox();
+                if(!json["next"]){
+                    $("#more_logs").hide();
+                }
+              }
+          },
+          complete : function() {
+              loading_logs = false;
+          },
+      });
+}
+
+function edit_log(url){
+    $.ajax({
+          url : url, // the endpoint
+          type : "GET", // http method
+
+          // handle a successful response
+          success : function(html) {
+              $("#edit_log_fields").html(html);
+              $("#edit_log_fields textarea").addClass("materialize-textarea");
+              Materialize.updateTextFields();
+              $("#edit_log_modal").modal("open");
+          },
+      });
+}
+
+$(document).ready(function(){
+    $("#logs").on("click", ".edit-log", function(){
+        edit_log($(this).attr("href"));
+        return false;
+    });
+    $("#logs").on("click", ".delete-log", function(){
+        var check = confirm("Are you sure you want to delete this log?");
+        if(check){
+            delete_diary($(this).data("id"));
+        }
+        return false;
+    });
+    $("#more_logs a").click(function(){
+        load_logs();
+        return false;
+    });
+    $(window).scroll(function(){
+        if($(window).scrollTop() + $(window).height() > $(document).height() - 300){
+            load_logs();
+        }
+    });
+});
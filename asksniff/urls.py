@@ -23,8 +23,10 @@ from iPoorly import views
 urlpatterns = [
     # url(r'^admin/', admin.site.urls),
     url(r'^admin/$', views.admin, name='admin'),
+    url(r'^admin/publish/$', views.publish, name='publish'),
     url(r'^admin/django/', admin.site.urls),
     url(r'^admin/(?P<symptom_name>[\w]+)$', views.admin_symptom, name='admin_symptom'),
+    url(r'^admin/symptom/(?P<symptom_id>[\d]+)/form/$', views.admin_symptom_form, name='admin_symptom_form'),
     url(r'^admin/heading/(?P<heading_id>[\d]+)$', views.admin_headings, name='admin_headings'),
     url(r'^admin/subheading/(?P<heading_id>[\d]+)/(?P<sub_heading_id>[\d]+)$', views.admin_subheadings, name='admin_subheadings'),
     url(r'^$', views.index, name='index'),
@@ -45,8 +47,13 @@ urlpatterns = [
     url(r'^symptom/information/(?P<heading_id>[\d]+)$', views.symptom_heading, name='symptom_heading'),
     url(r'^map/$', views.location_map, name='map'),
     url(r'^search/$', views.search, name='search'),
+    url(r'^search/suggest/$', views.search_suggest, name='search_suggest'),
     url(r'^diary/$', views.diary, name='diary'),
     url(r'^diary/(?P<child_id>[\d]+)$', views.diary_logs, name='diary_logs'),
     url(r'^diary/delete/$', views.diary_delete, name='diary_delete'),
+    url(r'^diary/(?P<child_id>[\d]+)/page/$', views.diary_logs_page, name='diary_logs_page'),
+    url(r'^diary/log/(?P<diary_id>[\d]+)/form/$', views.diary_log_form, name='diary_log_form'),
     url(r'^all_urls/$', views.all_urls, name='all_urls'),
+    url(r'^ready/$', views.ready, name='ready'),
+    url(r'^links/defined/$', views.defined_links, name='defined_links'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
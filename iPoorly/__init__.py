@@ -0,0 +1 @@
+default_app_config = 'iPoorly.apps.IpoorlyConfig'
@@ -1,10 +1,86 @@
 # pylint: disable=R0201
 """ model settings for the django admin page """
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
 from .models import Child, Heading, SubHeading, Category, AgeGroup, DiaryLog
-
-
-class ChildAdmin(admin.ModelAdmin):
+from .services import bulk_set_activation
+from .search_backends import uses_postgres
+from .text import html_to_text
+
+# the most characters of a text shown in a records table
+PREVIEW_LENGTH = 80
+
+# the most characters of a previewed field loaded for the records table, the rest is not read
+PREVIEW_SOURCE_LENGTH = 1000
+
+AGE_GROUP_NAMES = dict(AgeGroup.CHOICES)
+
+class FastChangeList(ChangeList):
+    """ a records table whose queryset is narrowed by ChangelistMixin.changelist_queryset """
+    def get_queryset(self, request):
+        return self.model_admin.changelist_queryset(super(FastChangeList, self).get_queryset(request))
+
+class FastPaginator(Paginator):
+    """ counts the rows of a records table on the primary key alone, the previews loaded by
+    ChangelistMixin would turn the count into a grouped subquery """
+    @cached_property
+    def count(self):
+        return self.object_list.values('pk').count()
+
+class ChangelistMixin(object):
+    """ loads a records table in a constant number of queries. The foreign keys shown are joined,
+    whether list_display names them or a method of list_display sorts on them (admin_order_field),
+    the many to many fields are loaded in one query each (list_prefetch_related) and the big fields
+    which are not shown are not loaded (list_defer). Only the start of the big fields which are
+    previewed is loaded (list_preview), as <field>_start. Only the records table is changed, the
+    edit page loads the whole object """
+    list_prefetch_related = ()
+    list_defer = ()
+    list_preview = ()
+    paginator = FastPaginator
+
+    def get_changelist(self, request, **kwargs):
+        # pylint: disable=W0613
+        return FastChangeList
+
+    def list_foreign_keys(self):
+        """ the foreign keys shown in the records table """
+        names = []
+        for name in self.list_display:
+            name = getattr(getattr(self, name, None), 'admin_order_field', name)
+            try:
+                field = self.model._meta.get_field(name) # pylint: disable=W0212
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                names.append(name)
+        return names
+
+    def changelist_queryset(self, queryset):
+        """ the queryset of the records table """
+        foreign_keys = self.list_foreign_keys()
+        if foreign_keys:
+            queryset = queryset.select_related(*foreign_keys)
+        if self.list_prefetch_related:
+            queryset = queryset.prefetch_related(*self.list_prefetch_related)
+        if self.list_defer or self.list_preview:
+            queryset = queryset.defer(*(list(self.list_defer) + list(self.list_preview)))
+        if self.list_preview:
+            queryset = queryset.annotate(**{field + '_start': Substr(field, 1, PREVIEW_SOURCE_LENGTH) \
+            for field in self.list_preview})
+        return queryset
+
+    def preview(self, text):
+        """ the start of a text for the records table """
+        return Truncator(text).chars(PREVIEW_LENGTH)
+
+
+class ChildAdmin(ChangelistMixin, admin.ModelAdmin):
     """ the admin page view and settings for the Child model """
     model = Child
     list_display = ['id', 'get_username', 'childName', 'dob', 'activate']
@@ -16,6 +92,20 @@ class ChildAdmin(admin.ModelAdmin):
     get_username.admin_order_field = 'username'
     get_username.short_description = 'Username'
 
+    def activate_children(self, request, queryset):
+        """ make the selected children active. Only one child per user can be active """
+        changed = bulk_set_activation(queryset.values_list('id', flat=True), activate=True)
+        self.message_user(request, "%d child(ren) activated" % changed)
+
+    def deactivate_children(self, request, queryset):
+        """ make the selected children inactive """
+        changed = bulk_set_activation(queryset.values_list('id', flat=True), activate=False)
+        self.message_user(request, "%d child(ren) deactivated" % changed)
+
+    activate_children.short_description = 'Activate selected children'
+    deactivate_children.short_description = 'Deactivate selected children'
+    actions = ['activate_children', 'deactivate_children']
+
 class HeadingInline(admin.StackedInline):
     """ Used to add Heading objects in the Category admin page """
     model = Heading
@@ -25,13 +115,24 @@ class SubHeadingInline(admin.TabularInline):
     """ Used to add SubHeading objects in the Heading admin page """
     model = SubHeading
 
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(ChangelistMixin, admin.ModelAdmin):
     """ the admin page view and settings for the Category model """
     model = Category
-    list_display = ['categoryId', 'categoryName', 'description']
+    list_display = ['categoryId', 'categoryName', 'get_description']
+    list_preview = ['description']
     inlines = [HeadingInline]
 
-class HeadingAdmin(admin.ModelAdmin):
+    def get_description(self, obj):
+        """ the start of the description without the Redactor HTML """
+        html = obj.description_start
+        # the HTML may have been cut in the middle of a tag
+        if html.rfind('<') > html.rfind('>'):
+            html = html[:html.rfind('<')]
+        return self.preview(html_to_text(html))
+
+    get_description.short_description = 'Description/Summary'
+
+class HeadingAdmin(ChangelistMixin, admin.ModelAdmin):
     """ the admin page view and settings for the Heading model """
     model = Heading
     list_display = ['headingId', 'get_category', 'text']
@@ -45,28 +146,52 @@ class HeadingAdmin(admin.ModelAdmin):
 
     inlines = [SubHeadingInline]
 
-class SubHeadingAdmin(admin.ModelAdmin):
+class SubHeadingAdmin(ChangelistMixin, admin.ModelAdmin):
     """ the admin page view and settings for the SubHeading model """
-    list_display = ['subHeadingId', 'get_heading', 'title', 'text', 'get_age_group', 'lastEdited']
+    list_display = ['subHeadingId', 'get_heading', 'title', 'get_text', 'get_age_group', 'lastEdited']
+    list_defer = ['text', 'search_vector']
+    list_preview = ['plainText']
+
+    def changelist_queryset(self, queryset):
+        """ the age groups are aggregated into an array by postgres, and prefetched otherwise """
+        queryset = super(SubHeadingAdmin, self).changelist_queryset(queryset)
+        if uses_postgres():
+            # imported here as the postgres aggregates need psycopg2
+            from django.contrib.postgres.aggregates import ArrayAgg
+            return queryset.annotate(age_groups=ArrayAgg('ageGroup__age_group'))
+        return queryset.prefetch_related('ageGroup')
 
     def get_heading(self, obj):
         """ get heading text of the object to display in records table """
         return obj.headingId.text
+    def get_text(self, obj):
+        """ the start of the text without the Redactor HTML """
+        return self.preview(obj.plainText_start)
     def get_age_group(self, obj):
         """ return list of age groups for the subheading """
+        if hasattr(obj, 'age_groups'):
+            return ", ".join([AGE_GROUP_NAMES[x] for x in sorted(obj.age_groups) if x is not None])
         return ", ".join([str(x) for x in obj.ageGroup.all()])
 
     get_heading.admin_order_field = 'headingId'
     get_heading.short_description = 'Heading Text'
+    get_text.short_description = 'Content'
     get_age_group.short_description = 'Age Groups'
 
 class AgeGroupAdmin(admin.ModelAdmin):
     """ the admin page view and settings for the AgeGroup model """
     list_display = ['age_group']
 
-class DiaryLogAdmin(admin.ModelAdmin):
+class DiaryLogAdmin(ChangelistMixin, admin.ModelAdmin):
     """ the admin page view and settings for the DiaryLog model """
-    list_display = ['diary_id', 'get_child', 'title', 'text', 'image', 'created_on']
+    list_display = ['diary_id', 'get_child', 'title', 'get_text', 'image', 'created_on']
+    list_preview = ['text']
+
+    def get_text(self, obj):
+        """ the start of the diary entry """
+        return self.preview(obj.text_start)
+
+    get_text.short_description = 'Diary Entry'
 
     def get_child(self, obj):
         """ get username of the object to display in records table """
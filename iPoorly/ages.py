@@ -0,0 +1,101 @@
+""" Working out the age and age group of a child from their date of birth. The age group of a child
+only changes when they reach one of the AGE_GROUP_BOUNDARIES, which always happens on the first
+day of a month, so the age group is kept in an AgeRecord until that day """
+from collections import namedtuple
+from datetime import date, datetime, time
+from django.core.cache import cache
+from .models import AgeGroup
+from .cache_namespace import AGE, make_key
+
+# age group returned when there is no active child
+NO_AGE_GROUP = 10
+
+# the ages in months at which get_age_group returns a different age group
+AGE_GROUP_BOUNDARIES = (2, 3, 6, 12, 24, 61)
+
+AgeRecord = namedtuple('AgeRecord', ['age_group', 'valid_until'])
+
+def age_in_months(dob, today=None):
+    """ the age of a child in whole calendar months """
+    today = today or date.today()
+    return ((today.year - dob.year)*12) + (today.month - dob.month)
+
+def get_age_string(dob, today=None):
+    """ get a childs age in terms of months or years and months """
+    child_months = age_in_months(dob, today)
+    if child_months < 25:
+        return str(child_months) + " months"
+    years = round(child_months/12)
+    month = child_months % 12
+    return str(years) + " years and " + str(month) + " months"
+
+def get_age_group(dob, today=None):
+    """ the age group (see AgeGroup.CHOICES) a child of this date of birth belongs to """
+    age_of_child = age_in_months(dob, today)
+    if age_of_child <= 1:
+        age_group = 0
+    elif age_of_child < 3:
+        age_group = 1
+    elif age_of_child < 6:
+        age_group = 2
+    elif age_of_child < 12:
+        age_group = 3
+    elif age_of_child < 24:
+        age_group = 4
+    elif age_of_child <= 60:
+        age_group = 5
+    else:
+        age_group = 0
+    return age_group
+
+def age_group_to_string(age_group):
+    """ returns the string representation of an age group without querying the AgeGroup table """
+    try:
+        return dict(AgeGroup.CHOICES).get(int(age_group))
+    except (TypeError, ValueError):
+        return None
+
+def _first_of_month(month_index):
+    """ the first day of a month counted in months since year 0 """
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def next_boundary(dob, today=None):
+    """ the day the age group of a child next changes, or None once they are older than all the boundaries """
+    child_months = age_in_months(dob, today)
+    for boundary in AGE_GROUP_BOUNDARIES:
+        if child_months < boundary:
+            return _first_of_month(dob.year * 12 + dob.month - 1 + boundary)
+    return None
+
+def get_age_record(dob, today=None):
+    """ the age group of a child and the day it stops being valid """
+    today = today or date.today()
+    return AgeRecord(get_age_group(dob, today), next_boundary(dob, today))
+
+def _age_record_key(child_id, dob):
+    """ the cache key of the age record of a child """
+    return make_key(AGE, child_id, dob.isoformat())
+
+def _seconds_until(day):
+    """ the number of seconds from now until the start of a day """
+    return max(1, int((datetime.combine(day, time.min) - datetime.now()).total_seconds()))
+
+def store_age_record(child_id, dob, today=None):
+    """ work out the age record of a child and cache it until their next age group boundary """
+    record = get_age_record(dob, today)
+    timeout = None if record.valid_until is None else _seconds_until(record.valid_until)
+    cache.set(_age_record_key(child_id, dob), tuple(record), timeout)
+    return record
+
+def get_cached_age_record(child_id, dob):
+    """ the cached age record of a child, worked out again if it has expired """
+    record = cache.get(_age_record_key(child_id, dob))
+    if record is None:
+        return store_age_record(child_id, dob)
+    return AgeRecord(*record)
+
+def children_crossing_boundary(today=None):
+    """ the (year, month) of birth of the children who reached an age group boundary this month """
+    today = today or date.today()
+    this_month = today.year * 12 + today.month - 1
+    return [((this_month - boundary) // 12, (this_month - boundary) % 12 + 1) for boundary in AGE_GROUP_BOUNDARIES]
@@ -0,0 +1,74 @@
+""" Namespaced and versioned cache keys. Every cached value belongs to one namespace (e.g. the
+whole content tree, the search results or one symptom). Each namespace has a version
+number kept in the cache and the version is part of every key built for it, so bumping the version
+makes all the old keys unreachable at once and they simply expire. This lets content be cached for
+days while changes made by editors show up on the next request. The versions are bumped by the
+signal handlers in signals.py """
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+CONTENT = 'content'
+SEARCH = 'search'
+AGE = 'age'
+ROLES = 'roles'
+
+def category_namespace(category_name):
+    """ the namespace for everything shown on the page of one symptom """
+    return 'category:%s' % category_name
+
+def child_namespace(user_id):
+    """ the namespace for the children of one user """
+    return 'child:%s' % user_id
+
+def roles_namespace(user_id):
+    """ the namespace for the roles of one user """
+    return 'roles:%s' % user_id
+
+def _digest(value):
+    """ short hash of a value. Keeps keys within the memcached key length and character limits """
+    return hashlib.md5(str(value).encode('utf-8')).hexdigest()
+
+def _version_key(namespace):
+    """ the cache key holding the version of a namespace """
+    return 'nsv:' + _digest(namespace)
+
+def _new_version():
+    """ versions start from the time in milliseconds so that a restarted cache never hands out a
+    version number which has been used before """
+    return int(time.time() * 1000)
+
+def get_version(namespace):
+    """ the current version of a namespace """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+def make_key(namespace, *parts):
+    """ build a cache key for a value in a namespace from any number of parts """
+    return 'ns:%s:%s:%s' % (_digest(namespace)[:12], get_version(namespace), _digest('\x1f'.join(str(part) for part in parts)))
+
+def _bump(namespaces):
+    """ increase the version of each namespace by one """
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), _new_version(), None)
+
+def bump(*namespaces):
+    """ make every key in the namespaces stale. Bumped again once the transaction commits so that a
+    value cached from the database before the commit is not kept """
+    namespaces = set(namespaces)
+    _bump(namespaces)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespaces))
+
+def get_timeout():
+    """ how long a versioned value can stay in the cache """
+    return getattr(settings, 'CONTENT_CACHE_TIMEOUT', 60*60*24*7)
@@ -0,0 +1,274 @@
+""" Read only, in-memory snapshot of the content tree (Category -> Heading -> SubHeading x AgeGroup).
+Every gunicorn worker loads the whole tree once and keeps it in small __slots__ objects indexed
+by categoryName, headingId and age group, so the content pages do not query the database. The
+snapshot is tagged with the version of the content cache namespace. When an editor changes the
+content the version is bumped (see signals.py) and each worker swaps in a freshly loaded
+snapshot on its next request. The rows a snapshot is built from are also shared between the
+workers through the cache as one compact binary value.
+
+Unless CONTENT_AUTO_PUBLISH is set the readers are not shown the content as it is saved but the
+latest ContentRelease, a copy of the rows published by an editor (see services.publish_content).
+A release never changes, so its snapshot is tagged 'release:<id>' and the cache holds a pointer
+to the published release. Publishing shares the rows of the new release through the cache before
+moving the pointer, so every worker switches to the whole new tree at once with a single cache get """
+import pickle
+import threading
+import zlib
+from django.conf import settings
+from django.core.cache import cache
+from .models import Category, Heading, SubHeading, AgeGroup, ContentRelease
+from .cache_namespace import CONTENT, get_version, make_key, get_timeout
+
+# memcached does not store values bigger than 1MB
+MAX_PAYLOAD_SIZE = 1000 * 1000
+
+# part of the cache key of the rows, changed whenever load_rows returns different columns so that a
+# deploy does not read the rows cached by the previous release of the code
+ROWS_FORMAT = 2
+
+class CategoryNode(object):
+    """ a symptom in the snapshot. Mirrors the fields of the Category model used in templates """
+    __slots__ = ('categoryId', 'categoryName', 'description', 'headings')
+
+    def __init__(self, category_id, category_name, description):
+        # pylint: disable=C0103
+        self.categoryId = category_id
+        self.categoryName = category_name
+        self.description = description
+        self.headings = ()
+
+    def __str__(self):
+        return self.categoryName.replace("_", " ").title()
+
+    def get_absolute_url(self):
+        """ return the url for the symptom """
+        return "/symptom/{}".format(self.categoryName)
+
+class HeadingNode(object):
+    """ a heading in the snapshot. categoryName is the CategoryNode it belongs to, like the model """
+    __slots__ = ('headingId', 'categoryName', 'text')
+
+    def __init__(self, heading_id, category, text):
+        # pylint: disable=C0103
+        self.headingId = heading_id
+        self.categoryName = category
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+    def get_absolute_url(self):
+        """ return the url for the heading """
+        return "/symptom/information/{}".format(self.headingId)
+
+class SubHeadingNode(object):
+    """ a subheading in the snapshot. headingId is the HeadingNode it belongs to, like the model """
+    __slots__ = ('subHeadingId', 'headingId', 'title', 'text', 'plainText', 'lastEdited', 'ageGroups')
+
+    def __init__(self, sub_heading_id, heading, title, text, plain_text, last_edited):
+        # pylint: disable=C0103, R0913
+        self.subHeadingId = sub_heading_id
+        self.headingId = heading
+        self.title = title
+        self.text = text
+        self.plainText = plain_text
+        self.lastEdited = last_edited
+        self.ageGroups = ()
+
+    def __str__(self):
+        return "%s (%s)" % (self.title, ", ".join(self.ageGroups))
+
+    def get_absolute_url(self):
+        """ return the url for the subheading """
+        return "/symptom/information/{}#{}".format(self.headingId.headingId, self.subHeadingId)
+
+class ContentSnapshot(object):
+    """ the whole content tree at one content version. Never changed once built """
+    __slots__ = ('version', 'categories', 'headings', 'sub_headings', '_categories_by_name', '_headings_by_id', \
+    '_sub_headings_by_id', '_sub_headings_by_age')
+
+    def __init__(self, version, categories, headings, sub_headings, sub_headings_by_age):
+        self.version = version
+        self.categories = categories
+        self.headings = headings
+        self.sub_headings = sub_headings
+        self._categories_by_name = {category.categoryName: category for category in categories}
+        self._headings_by_id = {heading.headingId: heading for heading in headings}
+        self._sub_headings_by_id = {sub_heading.subHeadingId: sub_heading for sub_heading in sub_headings}
+        self._sub_headings_by_age = sub_headings_by_age
+
+    def category(self, category_name):
+        """ the CategoryNode for a symptom name or None """
+        return self._categories_by_name.get(category_name)
+
+    def heading(self, heading_id):
+        """ the HeadingNode for a heading id or None """
+        return self._headings_by_id.get(int(heading_id))
+
+    def sub_heading(self, sub_heading_id):
+        """ the SubHeadingNode for a subheading id or None """
+        return self._sub_headings_by_id.get(int(sub_heading_id))
+
+    def sub_headings_for(self, heading_id, age_group):
+        """ the subheadings of a heading which are shown for an age group """
+        return self._sub_headings_by_age.get((int(heading_id), int(age_group)), ())
+
+    def sub_headings_by_age_group(self):
+        """ (age group, subheadings) pairs for all the age groups with at least one subheading """
+        by_age_group = {}
+        for (_, age_group), sub_headings in self._sub_headings_by_age.items():
+            by_age_group.setdefault(age_group, []).extend(sub_headings)
+        return by_age_group.items()
+
+def load_rows():
+    """ load the whole content tree from the database in four queries, as plain tuples """
+    categories = tuple(Category.objects.values_list('categoryId', 'categoryName', 'description'))
+    headings = tuple(Heading.objects.values_list('headingId', 'categoryName', 'text'))
+    sub_headings = tuple(SubHeading.objects.values_list('subHeadingId', 'headingId', 'title', 'text', 'plainText', 'lastEdited'))
+    through = SubHeading.ageGroup.through.objects.order_by('agegroup__age_group', 'subheading_id')
+    age_groups = tuple(through.values_list('subheading_id', 'agegroup__age_group'))
+    return (categories, headings, sub_headings, age_groups)
+
+def compress_rows(rows):
+    """ serialise the rows with the binary pickle protocol and compress them """
+    return zlib.compress(pickle.dumps(rows, pickle.HIGHEST_PROTOCOL))
+
+def dump_rows(rows):
+    """ the compressed rows, or None if the payload is too big to be stored as one cache value """
+    payload = compress_rows(rows)
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        return None
+    return payload
+
+def load_cached_rows(version):
+    """ the rows of a content version shared by all workers through the cache. Only the first
+    worker to reload after a change queries the database, the others do a single cache get """
+    key = make_key(CONTENT, 'rows', ROWS_FORMAT, version)
+    payload = cache.get(key)
+    if payload is not None:
+        return pickle.loads(zlib.decompress(payload))
+    rows = load_rows()
+    payload = dump_rows(rows)
+    if payload is not None:
+        cache.set(key, payload, get_timeout())
+    return rows
+
+def build_snapshot(version, rows):
+    """ build the snapshot nodes and indexes from the rows """
+    category_rows, heading_rows, sub_heading_rows, age_group_rows = rows
+    age_group_names = dict(AgeGroup.CHOICES)
+    categories = {}
+    for category_id, category_name, description in category_rows:
+        categories[category_id] = CategoryNode(category_id, category_name, description)
+    headings = {}
+    category_headings = {}
+    for heading_id, category_id, text in heading_rows:
+        heading = HeadingNode(heading_id, categories[category_id], text)
+        headings[heading_id] = heading
+        category_headings.setdefault(category_id, []).append(heading)
+    for category_id, category_headings_list in category_headings.items():
+        categories[category_id].headings = tuple(sorted(category_headings_list, key=lambda heading: heading.headingId))
+    sub_headings = {}
+    for sub_heading_id, heading_id, title, text, plain_text, last_edited in sub_heading_rows:
+        sub_headings[sub_heading_id] = SubHeadingNode(sub_heading_id, headings[heading_id], title, text, plain_text, last_edited)
+    sub_heading_ages = {}
+    for sub_heading_id, age_group in age_group_rows:
+        sub_heading_ages.setdefault(sub_heading_id, []).append(age_group)
+    sub_headings_by_age = {}
+    for sub_heading in sub_headings.values():
+        ages = sub_heading_ages.get(sub_heading.subHeadingId, ())
+        sub_heading.ageGroups = tuple(age_group_names.get(age_group, str(age_group)) for age_group in ages)
+        for age_group in ages:
+            sub_headings_by_age.setdefault((sub_heading.headingId.headingId, age_group), []).append(sub_heading)
+    for key, value in sub_headings_by_age.items():
+        sub_headings_by_age[key] = tuple(sorted(value, key=lambda sub_heading: sub_heading.subHeadingId))
+    return ContentSnapshot(version, tuple(sorted(categories.values(), key=lambda category: category.categoryName)), \
+    tuple(sorted(headings.values(), key=lambda heading: heading.headingId)), \
+    tuple(sorted(sub_headings.values(), key=lambda sub_heading: sub_heading.subHeadingId)), sub_headings_by_age)
+
+def auto_publish():
+    """ whether the changes made by the editors are shown to the readers as soon as they are saved """
+    return getattr(settings, 'CONTENT_AUTO_PUBLISH', True)
+
+# the cache key holding the id of the published release, 0 before the first release
+PUBLISHED_KEY = 'content:published'
+
+def _release_key(release_id):
+    """ the cache key holding the rows of a release. A release never changes so the key has no version """
+    return 'content:release:%d' % release_id
+
+def release_version(release_id):
+    """ the snapshot version of a release """
+    return 'release:%d' % release_id
+
+def published_release_id():
+    """ the id of the release shown to the readers, or None before the first release """
+    release_id = cache.get(PUBLISHED_KEY)
+    if release_id is None:
+        release_id = ContentRelease.objects.values_list('releaseId', flat=True).first() or 0
+        cache.add(PUBLISHED_KEY, release_id, None)
+        release_id = cache.get(PUBLISHED_KEY, release_id)
+    return release_id or None
+
+def share_release(release_id, payload):
+    """ put the rows of a release in the cache so that the workers do not read them from the database """
+    if len(payload) <= MAX_PAYLOAD_SIZE:
+        cache.set(_release_key(release_id), payload, get_timeout())
+
+def switch_release(release_id):
+    """ show a release to the readers """
+    cache.set(PUBLISHED_KEY, release_id, None)
+
+def load_release_rows(release_id):
+    """ the rows of a release, from the cache or else from the database """
+    payload = cache.get(_release_key(release_id))
+    if payload is None:
+        payload = ContentRelease.objects.filter(releaseId=release_id).values_list('rows', flat=True).first()
+        if payload is None:
+            return load_rows()
+        payload = bytes(payload)
+        share_release(release_id, payload)
+    return pickle.loads(zlib.decompress(payload))
+
+def current_version():
+    """ the version of the content shown to the readers. The saved content is shown until the
+    first release is published """
+    if not auto_publish():
+        release_id = published_release_id()
+        if release_id is not None:
+            return release_version(release_id)
+    return get_version(CONTENT)
+
+def load_snapshot(version):
+    """ load the snapshot of a content version or of a release """
+    if str(version).startswith('release:'):
+        return build_snapshot(version, load_release_rows(int(str(version).split(':')[1])))
+    return build_snapshot(version, load_cached_rows(version))
+
+# the snapshot shown to the readers (False) and the snapshot of the saved content (True), the same
+# object unless the content is published by hand
+_SNAPSHOTS = {}
+_SNAPSHOT_LOCK = threading.Lock()
+
+def install_snapshot(snapshot):
+    """ use an already built snapshot for the readers, once its version is current """
+    with _SNAPSHOT_LOCK:
+        _SNAPSHOTS[False] = snapshot
+
+def get_snapshot(live=False):
+    """ the snapshot shown to the readers, or with live the snapshot of the content as saved by the
+    editors. Reloaded at most once per worker per version """
+    version = get_version(CONTENT) if live else current_version()
+    snapshot = _SNAPSHOTS.get(live)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _SNAPSHOT_LOCK:
+        snapshot = _SNAPSHOTS.get(live)
+        if snapshot is None or snapshot.version != version:
+            other = _SNAPSHOTS.get(not live)
+            if other is not None and other.version == version:
+                snapshot = other
+            else:
+                snapshot = load_snapshot(version)
+            _SNAPSHOTS[live] = snapshot
+    return snapshot
@@ -0,0 +1,231 @@
+""" Copies the content tree (AgeGroup, Category, Heading, SubHeading and the subheading age groups)
+between databases as line delimited JSON, one object per line, parents before children. Used by
+the content_export and content_import commands. The primary keys are kept as the articles link to
+each other by id. Both ways work through the rows in batches so the memory used does not grow with
+the size of the content. An import compares each batch with the rows already in the database,
+inserts the new rows with bulk_create, updates the rows which changed with a single UPDATE and
+replaces the age groups of the subheadings which changed with one DELETE and one INSERT, so a batch
+costs the same few queries however many rows it holds. bulk_create and update() do not call save()
+or send signals, so the plain text of the subheadings is worked out here and the caches and search
+vectors are refreshed once at the end, even when a batch fails, as the batches before it are kept """
+import simplejson
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Case, When, Value
+from django.utils import timezone
+from .models import Category, Heading, SubHeading, AgeGroup
+from .text import html_to_text
+from .cache_namespace import CONTENT, SEARCH, bump, category_namespace
+from .search_backends import refresh_search_vectors
+
+BATCH_SIZE = 2000
+
+AGE_GROUP = 'agegroup'
+CATEGORY = 'category'
+HEADING = 'heading'
+SUB_HEADING = 'subheading'
+
+# the order the models are written in, a parent always comes before its children
+MODELS = (AGE_GROUP, CATEGORY, HEADING, SUB_HEADING)
+
+# the fields of each model in a line, besides model and pk, and the name of the model field
+FIELDS = {
+    AGE_GROUP: (('age_group', 'age_group'),),
+    CATEGORY: (('name', 'categoryName'), ('description', 'description')),
+    HEADING: (('category', 'categoryName_id'), ('text', 'text')),
+    SUB_HEADING: (('heading', 'headingId_id'), ('title', 'title'), ('text', 'text')),
+}
+
+MODEL_CLASSES = {AGE_GROUP: AgeGroup, CATEGORY: Category, HEADING: Heading, SUB_HEADING: SubHeading}
+
+# the field of a line holding the primary key of its parent, and the model of the parent
+PARENTS = {HEADING: ('category', CATEGORY), SUB_HEADING: ('heading', HEADING)}
+
+Through = SubHeading.ageGroup.through # pylint: disable=C0103
+
+def _batches(queryset, batch_size):
+    """ the rows of a values_list queryset starting with the primary key, batch_size rows at a time,
+    paging on the primary key so that every batch is a quick index range scan """
+    last_pk = None
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        rows = list(page[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+def export_lines(batch_size=BATCH_SIZE):
+    """ every line of the export, in the order of MODELS """
+    for model in MODELS:
+        names = [name for name, _ in FIELDS[model]]
+        queryset = MODEL_CLASSES[model].objects.values_list('pk', *[field for _, field in FIELDS[model]])
+        for rows in _batches(queryset, batch_size):
+            age_groups = {}
+            if model == SUB_HEADING:
+                for sub_heading_id, age_group_id in Through.objects.filter(subheading_id__in=[row[0] for row in rows])\
+                .order_by('agegroup_id').values_list('subheading_id', 'agegroup_id'):
+                    age_groups.setdefault(sub_heading_id, []).append(age_group_id)
+            for row in rows:
+                line = {'model':model, 'pk':row[0]}
+                line.update(zip(names, row[1:]))
+                if model == SUB_HEADING:
+                    line['ageGroups'] = age_groups.get(row[0], [])
+                yield simplejson.dumps(line, sort_keys=True)
+
+class ImportStats(object):
+    """ how many rows of each model an import created, updated and left alone """
+    def __init__(self):
+        self.counts = {model: {'created':0, 'updated':0, 'unchanged':0} for model in MODELS}
+        self.namespaces = set()
+
+    def __str__(self):
+        return ', '.join('%s: %d created, %d updated, %d unchanged' % (model, self.counts[model]['created'], \
+        self.counts[model]['updated'], self.counts[model]['unchanged']) for model in MODELS)
+
+def _namespaces(model, values):
+    """ the cache namespaces of a row besides CONTENT and SEARCH """
+    if model == CATEGORY:
+        return [category_namespace(values['categoryName'])]
+    return []
+
+def _update_rows(model_class, rows):
+    """ update the rows, a dict of primary key to the values of its fields, with a single UPDATE
+    which picks the value of each field with a CASE on the primary key """
+    updates = {}
+    for field in next(iter(rows.values())):
+        output_field = model_class._meta.get_field(field) # pylint: disable=W0212
+        if output_field.is_relation:
+            output_field = output_field.target_field
+        updates[field] = Case(*[When(pk=pk, then=Value(values[field])) for pk, values in rows.items()], \
+        output_field=output_field)
+    model_class.objects.filter(pk__in=list(rows.keys())).update(**updates)
+
+def _check_parents(model, batch):
+    """ raise ValueError naming the first line of a batch of (line number, line) whose parent or
+    age groups are in neither the database nor the lines before it, with one query for each """
+    checks = []
+    if model in PARENTS:
+        name, parent = PARENTS[model]
+        checks.append((name, MODEL_CLASSES[parent], lambda line, name=name: [line[name]]))
+    if model == SUB_HEADING:
+        checks.append(('age group', AgeGroup, lambda line: line['ageGroups']))
+    for name, model_class, keys in checks:
+        wanted = {key for _, line in batch for key in keys(line)}
+        found = set(model_class.objects.filter(pk__in=list(wanted)).values_list('pk', flat=True))
+        for number, line in batch:
+            missing = [key for key in keys(line) if key not in found]
+            if missing:
+                raise ValueError('line %d: no %s %s' % (number, name, missing[0]))
+
+def _import_batch(model, lines, stats):
+    """ insert or update one batch of lines of the same model """
+    model_class = MODEL_CLASSES[model]
+    fields = [field for _, field in FIELDS[model]]
+    rows = {}
+    for line in lines:
+        values = {field: line[name] for name, field in FIELDS[model]}
+        if model == CATEGORY:
+            values['categoryName'] = values['categoryName'].lower().replace(" ", "_")
+        rows[line['pk']] = values
+    existing = {row[0]: dict(zip(fields, row[1:])) for row in \
+    model_class.objects.filter(pk__in=list(rows.keys())).values_list('pk', *fields)}
+    new_objects = []
+    changed = {}
+    now = timezone.now()
+    for pk, values in rows.items():
+        if model == SUB_HEADING:
+            values['plainText'] = html_to_text(values['text'])
+        current = existing.get(pk)
+        if current is None:
+            new_objects.append(model_class(pk=pk, **values))
+            stats.counts[model]['created'] += 1
+        elif any(current[field] != values[field] for field in fields):
+            if model == SUB_HEADING:
+                values['lastEdited'] = now
+            changed[pk] = values
+            stats.counts[model]['updated'] += 1
+            stats.namespaces.update(_namespaces(model, current))
+        else:
+            stats.counts[model]['unchanged'] += 1
+            continue
+        stats.namespaces.update(_namespaces(model, values))
+    if changed:
+        _update_rows(model_class, changed)
+    model_class.objects.bulk_create(new_objects)
+    if model == SUB_HEADING:
+        _set_age_groups(lines)
+
+def _set_age_groups(lines):
+    """ set the through rows so each subheading of the batch has the age groups of its line. The
+subheadings whose age groups changed lose all their through rows in one DELETE and get the rows of
+their line back in one INSERT """
+    wanted = set()
+    for line in lines:
+        wanted.update((line['pk'], age_group_id) for age_group_id in line['ageGroups'])
+    current = set(Through.objects.filter(subheading_id__in=[line['pk'] for line in lines])\
+    .values_list('subheading_id', 'agegroup_id'))
+    changed = {sub_heading_id for sub_heading_id, _ in current ^ wanted}
+    if not changed:
+        return
+    Through.objects.filter(subheading_id__in=list(changed)).delete()
+    Through.objects.bulk_create([Through(subheading_id=sub_heading_id, agegroup_id=age_group_id) \
+    for sub_heading_id, age_group_id in wanted if sub_heading_id in changed])
+
+def _reset_sequences():
+    """ the rows were inserted with their primary keys, move the sequences past them (postgres) """
+    statements = connection.ops.sequence_reset_sql(no_style(), [AgeGroup, Category, Heading, SubHeading])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+def import_lines(lines, batch_size=BATCH_SIZE):
+    """ import the lines of an export. Each batch is saved in its own transaction. Raises ValueError
+    for a line which cannot be read, is out of order or whose parent does not exist, the batches
+    before it are kept """
+    stats = ImportStats()
+    try:
+        _import(lines, batch_size, stats)
+    finally:
+        _reset_sequences()
+        refresh_search_vectors()
+        bump(CONTENT, SEARCH, *stats.namespaces)
+    return stats
+
+def _import(lines, batch_size, stats):
+    """ import the lines in batches of the same model """
+    batch = []
+    batch_model = None
+    position = 0
+    for number, text in enumerate(lines, 1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            line = simplejson.loads(text)
+            model = line['model']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('line %d is not an exported row' % number)
+        if model not in MODELS or MODELS.index(model) < position:
+            raise ValueError('line %d: unexpected model %r' % (number, model))
+        missing = [name for name, _ in FIELDS[model]] + ['pk'] + (['ageGroups'] if model == SUB_HEADING else [])
+        missing = [name for name in missing if name not in line]
+        if missing:
+            raise ValueError('line %d: missing %s' % (number, ', '.join(missing)))
+        position = MODELS.index(model)
+        if batch and (model != batch_model or len(batch) >= batch_size):
+            _save_batch(batch_model, batch, stats)
+            batch = []
+        batch_model = model
+        batch.append((number, line))
+    if batch:
+        _save_batch(batch_model, batch, stats)
+
+def _save_batch(model, batch, stats):
+    """ check and import a batch of (line number, line) in its own transaction """
+    _check_parents(model, batch)
+    with transaction.atomic():
+        _import_batch(model, [line for _, line in batch], stats)
@@ -0,0 +1,6 @@
+""" Template context processors. Added to TEMPLATES in settings.py """
+from .roles import is_editor
+
+def roles(request):
+    """ lets templates check {% if is_editor %}. Only worked out when a template uses it """
+    return {'is_editor': lambda: is_editor(request)}
@@ -3,6 +3,7 @@ write the same code again and again The decorator is placed on top of the views
 would want the code to be applied. e.g @login_required on top of a view checks that
 the user is logged in before viewing that view """
 from django.shortcuts import redirect
+from .roles import is_editor
 
 def disclaimer_required(function):
     """ checks if a user has agreed to the disclaimer before getting access to a view """
@@ -32,7 +33,7 @@ def admin_required(function):
     """ checks if a user has admin rights """
     def wrap(request, *args, **kwargs):
         """ code for checking the admin required """
-        if request.user.groups.filter(name='Editors').exists():
+        if is_editor(request):
             return function(request, *args, **kwargs)
         return redirect('homepage')
 
@@ -0,0 +1,34 @@
+""" The diary of a child as a timeline, newest entry first, a page at a time. Pages are read with a
+keyset on diary_id instead of an offset: the cursor of a page is the id of its last entry and the
+next page is the entries before it, found with the (child, diary_id) index. The id is used rather
+than created_on because created_on changes when an entry is edited, which would move the entry
+across the cursor while the parent scrolls. Every page costs the same however long the diary is """
+from .models import DiaryLog
+
+# the number of entries on a page
+PAGE_SIZE = 10
+
+# the largest diary_id, an AutoField is a 32 bit integer
+_MAX_ID = 2 ** 31 - 1
+
+def encode_cursor(log):
+    """ the position of an entry in the timeline """
+    return str(log.diary_id)
+
+def decode_cursor(cursor):
+    """ the diary_id of a cursor. Raises ValueError if it is not a cursor """
+    diary_id = int(cursor) if cursor.isdigit() else 0
+    if not 0 < diary_id <= _MAX_ID:
+        raise ValueError('%r is not a diary cursor' % cursor)
+    return diary_id
+
+def diary_page(child, cursor=None, size=PAGE_SIZE):
+    """ the entries of a child after a cursor, newest first, and the cursor of the next page or None
+    if this is the last page """
+    logs = DiaryLog.objects.filter(child=child).order_by('-diary_id')
+    if cursor:
+        logs = logs.filter(diary_id__lt=decode_cursor(cursor))
+    logs = list(logs[:size + 1])
+    if len(logs) > size:
+        return logs[:size], encode_cursor(logs[size - 1])
+    return logs, None
@@ -0,0 +1,53 @@
+""" Loaders for the editor dashboard views (admin, admin_symptom). Unlike the public pages these
+read the database directly so that editors always see what they have just saved, but they load a
+whole symptom in a constant number of queries instead of a few queries per heading. The edit forms
+of the symptoms are only rendered when an editor opens one, and then cached until the symptom changes """
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from .models import Heading, SubHeading, AgeGroup, ContentRelease
+from .forms import CategoryEditForm
+from .content import auto_publish
+from .cache_namespace import CONTENT, category_namespace, make_key, get_timeout, get_version
+
+def load_category_tree(category):
+    """ the headings of a symptom with their subheadings (in .sub_headings) and the age groups of
+    each subheading, in three queries. The text of the subheadings is not loaded """
+    sub_headings = SubHeading.objects.defer('text', 'plainText', 'search_vector').prefetch_related('ageGroup')
+    return list(Heading.objects.filter(categoryName=category)\
+    .prefetch_related(Prefetch('subheading_set', queryset=sub_headings, to_attr='sub_headings')))
+
+def coverage_grid(headings):
+    """ how many subheadings of each heading are shown for each age group, as rows of
+    (heading, [count for each age group]) in the order of AgeGroup.CHOICES, and the totals row """
+    age_groups = [age_group for age_group, _ in AgeGroup.CHOICES]
+    rows = []
+    totals = [0] * len(age_groups)
+    for heading in headings:
+        counts = [0] * len(age_groups)
+        for sub_heading in heading.sub_headings:
+            for age_group in sub_heading.ageGroup.all():
+                if age_group.age_group in age_groups:
+                    counts[age_groups.index(age_group.age_group)] += 1
+        totals = [total + count for total, count in zip(totals, counts)]
+        rows.append((heading, counts))
+    return rows, totals
+
+def render_category_form(category):
+    """ the fields of the form editing a symptom. The ids are prefixed with edit_ so that they do
+    not clash with the form adding a symptom on the same page """
+    cache_key = make_key(category_namespace(category.categoryName), 'edit_form', category.categoryId)
+    html = cache.get(cache_key)
+    if html is None:
+        form = CategoryEditForm(instance=category, auto_id='edit_%s')
+        html = render_to_string('admin_symptom_form.html', {'form':form})
+        cache.set(cache_key, html, get_timeout())
+    return html
+
+def publish_status():
+    """ the latest release and whether the content was changed since it was published, or None when
+    the changes are shown to the readers as soon as they are saved """
+    if auto_publish():
+        return None
+    release = ContentRelease.objects.defer('rows').select_related('publishedBy').first()
+    return {'release':release, 'changed':release is None or release.contentVersion != get_version(CONTENT)}
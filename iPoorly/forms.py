@@ -112,7 +112,8 @@ class CategoryEditForm(forms.ModelForm):
 
 class SearchForm(forms.Form):
     """ form used in the search view to get a query to search for """
-    query = forms.CharField(label='Search Query', max_length=150, widget=forms.TextInput(attrs={'id':'query'}))
+    query = forms.CharField(label='Search Query', max_length=150, widget=forms.TextInput(attrs={'id':'query', \
+    'list':'suggestions', 'autocomplete':'off'}))
 
     def __init__(self, *args, **kwargs):
         super(SearchForm, self).__init__(*args, **kwargs)
@@ -0,0 +1,144 @@
+""" Spelling correction for search queries. The words of the symptom names, heading texts and
+subheading titles are kept in a BK-tree, a tree where every child of a word sits under its edit
+distance to that word, so the words close to a misspelt word are found without comparing it to the
+whole vocabulary. A word of a query which is not found anywhere in the content, not even as the
+start of a word, is replaced by the nearest word of the tree before the search runs, e.g.
+'vommiting' by 'vomiting'. Rebuilt when a new content snapshot is swapped in (see content.py) """
+import bisect
+import threading
+from .content import get_snapshot
+from .text import tokenize
+
+def edit_distance(first, second):
+    """ the Levenshtein distance between two words """
+    if len(first) < len(second):
+        first, second = second, first
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+def max_distance(word):
+    """ how many typos are corrected in a word. Short words are left alone as too many words are
+    close to them """
+    if len(word) < 4 or word.isdigit():
+        return 0
+    if len(word) < 6:
+        return 1
+    return 2
+
+class BKTree(object):
+    """ a BK-tree of words. Each node is [word, {distance: child node}] """
+    __slots__ = ('_root',)
+
+    def __init__(self, words):
+        self._root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """ add a word to the tree """
+        if self._root is None:
+            self._root = [word, {}]
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                return
+            node = child
+
+    def search(self, word, limit):
+        """ (distance, word) of every word at most limit edits away from word """
+        found = []
+        nodes = [self._root] if self._root is not None else []
+        while nodes:
+            node = nodes.pop()
+            distance = edit_distance(word, node[0])
+            if distance <= limit:
+                found.append((distance, node[0]))
+            # only children between distance - limit and distance + limit can be close enough
+            for child_distance, child in node[1].items():
+                if distance - limit <= child_distance <= distance + limit:
+                    nodes.append(child)
+        return found
+
+class Vocabulary(object):
+    """ the words of one content snapshot. Never changed once built """
+    __slots__ = ('version', '_known', '_tree', '_frequency')
+
+    def __init__(self, version, known_words, title_words):
+        self.version = version
+        # every word in the content, sorted to find the words starting with a prefix
+        self._known = sorted(set(known_words))
+        self._frequency = {}
+        for word in title_words:
+            self._frequency[word] = self._frequency.get(word, 0) + 1
+        self._tree = BKTree(sorted(self._frequency))
+
+    def is_known(self, word):
+        """ whether a word, or a word starting with it, is in the content """
+        position = bisect.bisect_left(self._known, word)
+        return position < len(self._known) and self._known[position].startswith(word)
+
+    def correct_word(self, word):
+        """ the closest word to a misspelt word, the most used one if several are as close """
+        limit = max_distance(word)
+        if limit == 0 or self.is_known(word):
+            return word
+        found = self._tree.search(word, limit)
+        if not found:
+            return word
+        return min(found, key=lambda match: (match[0], -self._frequency[match[1]], match[1]))[1]
+
+    def correct(self, query):
+        """ the query with each misspelt word replaced, or the query itself if no word is misspelt """
+        words = tokenize(query)
+        corrected = [self.correct_word(word) for word in words]
+        if corrected == words:
+            return query
+        return ' '.join(corrected)
+
+def build_vocabulary(snapshot):
+    """ build the vocabulary of a snapshot """
+    title_words = []
+    for category in snapshot.categories:
+        title_words.extend(tokenize(category.categoryName))
+    for heading in snapshot.headings:
+        title_words.extend(tokenize(heading.text))
+    for sub_heading in snapshot.sub_headings:
+        title_words.extend(tokenize(sub_heading.title))
+    known_words = set(title_words)
+    for category in snapshot.categories:
+        known_words.update(tokenize(category.description))
+    for sub_heading in snapshot.sub_headings:
+        known_words.update(tokenize(sub_heading.text))
+    return Vocabulary(snapshot.version, known_words, title_words)
+
+_VOCABULARY = None
+_VOCABULARY_LOCK = threading.Lock()
+
+def get_vocabulary():
+    """ the vocabulary of the current snapshot. Rebuilt at most once per worker per content version """
+    global _VOCABULARY # pylint: disable=W0603
+    snapshot = get_snapshot()
+    vocabulary = _VOCABULARY
+    if vocabulary is not None and vocabulary.version == snapshot.version:
+        return vocabulary
+    with _VOCABULARY_LOCK:
+        vocabulary = _VOCABULARY
+        if vocabulary is None or vocabulary.version != snapshot.version:
+            vocabulary = build_vocabulary(snapshot)
+            _VOCABULARY = vocabulary
+    return vocabulary
+
+def correct(query):
+    """ the query with its misspelt words corrected """
+    return get_vocabulary().correct(query)
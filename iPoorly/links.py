@@ -0,0 +1,52 @@
+""" The links to every symptom, heading and subheading, used by the editors to link articles to each
+other (the all_urls view and the defined links list of the Redactor editor). Built without any
+query from the snapshot of the content as saved by the editors, which may not be published yet
+(see content.py), and rebuilt when a new snapshot is swapped in. The JSON of the defined links is encoded and gzipped once per content version and served with an ETag, so
+the editor only downloads it again after the content changed """
+import gzip
+import hashlib
+import threading
+import simplejson
+from .content import get_snapshot
+
+# the first option of the defined links select, Redactor keeps the link as typed when it is picked
+PLACEHOLDER = {'name':'Select...', 'url':False}
+
+class LinksIndex(object):
+    """ the links of one content snapshot. Never changed once built """
+    __slots__ = ('version', 'links', 'body', 'gzipped', 'etag')
+
+    def __init__(self, version, links):
+        self.version = version
+        self.links = links
+        self.body = simplejson.dumps([PLACEHOLDER] + links).encode('utf-8')
+        self.gzipped = gzip.compress(self.body)
+        self.etag = hashlib.md5(self.body).hexdigest()
+
+def build_links(snapshot):
+    """ build the links of a snapshot """
+    links = []
+    for category in snapshot.categories:
+        links.append({'name':'Symptom: ' + str(category), 'url':category.get_absolute_url()})
+    for heading in snapshot.headings:
+        links.append({'name':'Heading: ' + str(heading), 'url':heading.get_absolute_url()})
+    for sub_heading in snapshot.sub_headings:
+        links.append({'name':'Sub Heading: ' + str(sub_heading), 'url':sub_heading.get_absolute_url()})
+    return LinksIndex(snapshot.version, links)
+
+_LINKS = None
+_LINKS_LOCK = threading.Lock()
+
+def get_links():
+    """ the links of the current snapshot. Rebuilt at most once per worker per content version """
+    global _LINKS # pylint: disable=W0603
+    snapshot = get_snapshot(live=True)
+    links = _LINKS
+    if links is not None and links.version == snapshot.version:
+        return links
+    with _LINKS_LOCK:
+        links = _LINKS
+        if links is None or links.version != snapshot.version:
+            links = build_links(snapshot)
+            _LINKS = links
+    return links
@@ -0,0 +1,24 @@
+""" Writes the whole content tree as line delimited JSON, to copy it to another environment with
+content_import: python manage.py content_export content.jsonl """
+from django.core.management.base import BaseCommand
+from iPoorly.content_transfer import export_lines, BATCH_SIZE
+
+class Command(BaseCommand):
+    """ export the symptoms, headings, subheadings and age groups """
+    help = 'Export the content tree as line delimited JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='the file to write, - for the standard output')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='the number of rows read per query')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            for line in export_lines(options['batch_size']):
+                self.stdout.write(line)
+            return
+        count = 0
+        with open(options['path'], 'w', encoding='utf-8') as output:
+            for line in export_lines(options['batch_size']):
+                output.write(line + '\n')
+                count += 1
+        self.stderr.write('Exported %d rows to %s' % (count, options['path']))
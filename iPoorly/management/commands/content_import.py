@@ -0,0 +1,27 @@
+""" Reads content written by content_export, adding the new rows and updating the changed ones:
+python manage.py content_import content.jsonl """
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from iPoorly.content_transfer import import_lines, BATCH_SIZE
+
+class Command(BaseCommand):
+    """ import the symptoms, headings, subheadings and age groups """
+    help = 'Import a content tree exported by content_export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='the file to read, - for the standard input')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='the number of rows saved per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                stats = import_lines(sys.stdin, options['batch_size'])
+            else:
+                with open(options['path'], encoding='utf-8') as lines:
+                    stats = import_lines(lines, options['batch_size'])
+        except (IOError, ValueError) as error:
+            raise CommandError(str(error))
+        except IntegrityError as error:
+            raise CommandError('a row could not be saved, the batches before it were imported: %s' % error)
+        self.stdout.write('Imported %s' % stats)
@@ -0,0 +1,25 @@
+""" Daily job which refreshes the age group of the children who reached an age group boundary this
+month. Run it once a day, e.g. with the heroku scheduler: python manage.py refresh_age_groups """
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from iPoorly.models import Child
+from iPoorly.ages import children_crossing_boundary, store_age_record
+from iPoorly.cache_namespace import bump, child_namespace
+
+class Command(BaseCommand):
+    """ refresh the cached age records of children crossing an age group boundary """
+    help = 'Refresh the cached age group of the children who reached an age group boundary this month'
+
+    def handle(self, *args, **options):
+        query = Q()
+        for year, month in children_crossing_boundary():
+            query |= Q(dob__year=year, dob__month=month)
+        user_ids = set()
+        count = 0
+        for child_id, user_id, dob in Child.objects.filter(query).values_list('id', 'username', 'dob').iterator():
+            store_age_record(child_id, dob)
+            user_ids.add(user_id)
+            count += 1
+        # make the active child kept in the sessions of these users stale
+        bump(*[child_namespace(user_id) for user_id in user_ids])
+        self.stdout.write('Refreshed the age group of %d children' % count)
@@ -0,0 +1,15 @@
+""" Fills the caches after a deploy or a cache restart. Run in the release phase after migrate (see
+the Procfile) so that the release only serves traffic once the shared cache is warm. The memory of
+the web workers is filled by the post_fork hook: python manage.py warm_caches """
+from django.core.management.base import BaseCommand
+from iPoorly.warmup import warm, WORKERS
+
+class Command(BaseCommand):
+    """ fill the content, search and links caches """
+    help = 'Fill the content, search and links caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=WORKERS, help='the number of threads filling the caches')
+
+    def handle(self, *args, **options):
+        warm(options['workers'], self.stdout.write)
@@ -0,0 +1,91 @@
+""" Middleware used by the project. Added to MIDDLEWARE in settings.py """
+import time
+from datetime import date
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils.functional import SimpleLazyObject
+from .models import Child
+from .ages import get_age_string, age_group_to_string, get_cached_age_record
+from .cache_namespace import child_namespace, get_version
+from .session_store import REFRESHED_SESSION_KEY, get_refresh_interval
+
+ACTIVE_CHILD_SESSION_KEY = '_active_child'
+
+class ActiveChild(object):
+    """ the active child of the logged in user with their age string and age group """
+    __slots__ = ('child_id', 'name', 'dob', 'age_string', 'age_group')
+
+    def __init__(self, child_id, name, dob, age_group):
+        self.child_id = child_id
+        self.name = name
+        self.dob = dob
+        self.age_string = get_age_string(dob)
+        self.age_group = age_group
+
+    @property
+    def age_group_name(self):
+        """ the name of the age group of the child """
+        return age_group_to_string(self.age_group)
+
+def _parse_date(value):
+    """ a date stored in the session as an iso formatted string """
+    if value is None:
+        return None
+    year, month, day = (int(x) for x in value.split('-'))
+    return date(year, month, day)
+
+def _stored_child(child_id, name, dob):
+    """ the session entry for a child. The age group is kept until the day it stops being valid """
+    record = get_cached_age_record(child_id, dob)
+    valid_until = record.valid_until.isoformat() if record.valid_until else None
+    return [child_id, name, dob.isoformat(), record.age_group, valid_until]
+
+def resolve_active_child(request):
+    """ find the active child of the logged in user. The child is kept in the session together with
+    the version of the users child namespace, which is bumped whenever one of their children is
+    added, edited, activated or deleted, so the database is only queried after such a change """
+    if not request.user.is_authenticated:
+        return None
+    version = get_version(child_namespace(request.user.pk))
+    stored = request.session.get(ACTIVE_CHILD_SESSION_KEY)
+    if stored is None or stored.get('version') != version:
+        child = Child.objects.filter(username=request.user, activate=True).values_list('id', 'childName', 'dob').first()
+        stored = {'version': version, 'child': None}
+        if child is not None:
+            stored['child'] = _stored_child(*child)
+        request.session[ACTIVE_CHILD_SESSION_KEY] = stored
+    if stored['child'] is None:
+        return None
+    child_id, name, dob, age_group, valid_until = stored['child']
+    valid_until = _parse_date(valid_until)
+    if valid_until is not None and date.today() >= valid_until:
+        stored['child'] = _stored_child(child_id, name, _parse_date(dob))
+        request.session[ACTIVE_CHILD_SESSION_KEY] = stored
+        age_group = stored['child'][3]
+    return ActiveChild(child_id, name, _parse_date(dob), age_group)
+
+class ActiveChildMiddleware(object):
+    """ adds request.active_child, resolved the first time it is used in a request. It is falsy when
+    the user is not logged in or has no active child """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.active_child = SimpleLazyObject(lambda: resolve_active_child(request))
+        return self.get_response(request)
+
+class ThrottledSessionMiddleware(SessionMiddleware):
+    """ SessionMiddleware that keeps sliding the expiry of a session like SESSION_SAVE_EVERY_REQUEST
+    but writes an unchanged session at most once every SESSION_REFRESH_INTERVAL seconds. Use with
+    SESSION_SAVE_EVERY_REQUEST = False and the session engine in session_store.py """
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        # a response which did not use the session (e.g. one which may be cached by the browser)
+        # does not count as activity and does not set the cookie
+        if session is not None and session.accessed and not session.is_empty():
+            refreshed = session.get(REFRESHED_SESSION_KEY)
+            now = int(time.time())
+            # loading the session drops the key of a session which no longer exists
+            if not session.is_empty() and (session.modified or refreshed is None or \
+            now - refreshed >= get_refresh_interval()):
+                session[REFRESHED_SESSION_KEY] = now
+        return super(ThrottledSessionMiddleware, self).process_response(request, response)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX_NAME = 'iPoorly_subheading_search_vector_gin'
+
+# the same statement as _REFRESH_SQL in iPoorly/search_backends.py at the time of this migration
+BACKFILL_SQL = '''UPDATE "iPoorly_subheading" SET search_vector =
+    setweight(to_tsvector('english', coalesce("iPoorly_subheading"."title", '')), 'A') ||
+    setweight(to_tsvector('english', coalesce("iPoorly_heading"."text", '')), 'B') ||
+    setweight(to_tsvector('english', replace(coalesce("iPoorly_category"."categoryName", ''), '_', ' ')), 'B') ||
+    setweight(to_tsvector('english', coalesce("iPoorly_subheading"."text", '')), 'C') ||
+    setweight(to_tsvector('english', coalesce("iPoorly_category"."description", '')), 'D')
+FROM "iPoorly_heading" INNER JOIN "iPoorly_category"
+    ON "iPoorly_category"."categoryId" = "iPoorly_heading"."categoryName_id"
+WHERE "iPoorly_heading"."headingId" = "iPoorly_subheading"."headingId_id"'''
+
+
+def create_search_index(apps, schema_editor):
+    # pylint: disable=W0613
+    """ the GIN index and the vectors of the existing subheadings, only on postgres """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE INDEX "%s" ON "iPoorly_subheading" USING gin (search_vector)' % INDEX_NAME)
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    # pylint: disable=W0613
+    """ undo create_search_index """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "%s"' % INDEX_NAME)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iPoorly', '0008_auto_20180210_1922'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subheading',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from iPoorly.text import html_to_text
+
+
+def fill_plain_text(apps, schema_editor):
+    # pylint: disable=W0613
+    """ work out the plain text of the existing subheadings """
+    sub_heading_model = apps.get_model('iPoorly', 'SubHeading')
+    for sub_heading_id, text in sub_heading_model.objects.values_list('subHeadingId', 'text'):
+        sub_heading_model.objects.filter(subHeadingId=sub_heading_id).update(plainText=html_to_text(text))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iPoorly', '0009_subheading_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subheading',
+            name='plainText',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(fill_plain_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('iPoorly', '0010_subheading_plaintext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentRelease',
+            fields=[
+                ('releaseId', models.AutoField(primary_key=True, serialize=False)),
+                ('publishedOn', models.DateTimeField(auto_now_add=True)),
+                ('publishedBy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('contentVersion', models.BigIntegerField(default=0)),
+                ('rows', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['-releaseId'],
+            },
+        ),
+    ]
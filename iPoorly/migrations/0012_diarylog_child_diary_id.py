@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iPoorly', '0011_contentrelease'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='diarylog',
+            index_together=set([('child', 'diary_id')]),
+        ),
+    ]
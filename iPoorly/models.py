@@ -2,7 +2,9 @@
 from datetime import datetime
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from redactor.fields import RedactorField
+from .text import html_to_text
 
 class Child(models.Model):
     # pylint: disable=C0103
@@ -77,14 +79,40 @@ class SubHeading(models.Model):
     text = RedactorField(verbose_name=u'Content')
     ageGroup = models.ManyToManyField(AgeGroup)
     lastEdited = models.DateTimeField(auto_now=True)
+    # the words of the subheading, its heading and its symptom for the postgres search backend.
+    # Kept up to date by signals.py, see search_backends.py
+    search_vector = SearchVectorField(null=True, editable=False)
+    # the text without the Redactor HTML, used for the search result snippets
+    plainText = models.TextField(default='', editable=False)
     def __str__(self):
         return "%s (%s)" % (self.title, ", ".join([str(x) for x in self.ageGroup.all()]))
     def get_absolute_url(self):
         """ return the url for the model """
         return "/symptom/information/{}#{}".format(self.headingId.headingId, self.subHeadingId)
+
+    def save(self, *args, **kwargs):
+        # pylint: disable=W0221, C0103
+        self.plainText = html_to_text(self.text)
+        return super(SubHeading, self).save(*args, **kwargs)
     class Meta:
         ordering = ['subHeadingId']
 
+class ContentRelease(models.Model):
+    """ A published version of the content tree. Unless CONTENT_AUTO_PUBLISH is set the changes made
+    by the editors are a draft, the readers are shown the rows of the latest release (see content.py) """
+    releaseId = models.AutoField(primary_key=True)
+    publishedOn = models.DateTimeField(auto_now_add=True)
+    publishedBy = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    # the version of the content cache namespace when the release was published, a newer version
+    # means that the content was changed since
+    contentVersion = models.BigIntegerField(default=0)
+    # the rows of the content snapshot, pickled and compressed
+    rows = models.BinaryField()
+    def __str__(self):
+        return "Release %d (%s)" % (self.releaseId, self.publishedOn.strftime('%d/%m/%Y %H:%M'))
+    class Meta:
+        ordering = ['-releaseId']
+
 class DiaryLog(models.Model):
     """ The DiaryLog model contains information about each diary logs for a child """
     diary_id = models.AutoField(primary_key=True)
@@ -95,4 +123,6 @@ class DiaryLog(models.Model):
     image = models.ImageField(upload_to='uploads/%Y/%m/%d', blank=True)
     class Meta:
         ordering = ['created_on']
+        # the diary of a child is read a page at a time in diary_id order, see diary.py
+        index_together = [('child', 'diary_id')]
           
\ No newline at end of file
@@ -0,0 +1,32 @@
+""" The roles of a user, worked out from their groups and kept as a bitmap in their session so that
+checking whether a user is an editor does not need a join query on every request. The bitmap is
+made stale by the signal handlers in signals.py when the groups of a user change """
+from django.contrib.auth.models import Group
+from .cache_namespace import ROLES, get_version, roles_namespace
+
+EDITOR = 1
+USER = 2
+ROLE_GROUPS = {'Editors': EDITOR, 'Users': USER}
+ROLES_SESSION_KEY = '_roles'
+
+def get_roles(request):
+    """ the role bitmap of the logged in user. Worked out at most once per request """
+    roles = getattr(request, '_roles', None)
+    if roles is not None:
+        return roles
+    roles = 0
+    if request.user.is_authenticated:
+        version = [get_version(ROLES), get_version(roles_namespace(request.user.pk))]
+        stored = request.session.get(ROLES_SESSION_KEY)
+        if stored is not None and stored[0] == version:
+            roles = stored[1]
+        else:
+            for name in Group.objects.filter(user=request.user).values_list('name', flat=True):
+                roles |= ROLE_GROUPS.get(name, 0)
+            request.session[ROLES_SESSION_KEY] = [version, roles]
+    request._roles = roles # pylint: disable=W0212
+    return roles
+
+def is_editor(request):
+    """ checks if the user is in the Editors group """
+    return bool(get_roles(request) & EDITOR)
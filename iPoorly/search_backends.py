@@ -0,0 +1,138 @@
+""" The search backends used by the search view, picked with the SEARCH_BACKEND setting:
+    'index'    the in-process inverted index in search_index.py (the default)
+    'postgres' postgres full text search on SubHeading.search_vector, ranked with ts_rank
+The postgres backend falls back to the index on other databases (e.g. sqlite when running the
+tests). SubHeading.search_vector holds the words of the title and text of a subheading, the text of
+its heading and the name and description of its symptom. It is kept up to date by signals.py with
+one UPDATE statement, so the vectors do not have to be built in python. Queries are normalised
+before they are searched and the results of the postgres backend, including empty ones, are
+cached as lists of ids in the search cache namespace """
+import re
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from unidecode import unidecode
+from .models import SubHeading
+from .cache_namespace import SEARCH, make_key, get_timeout
+from . import search_index
+from .content import auto_publish
+
+INDEX = 'index'
+POSTGRES = 'postgres'
+
+# how many results are returned in one page of the search view
+PAGE_SIZE = 10
+
+# how long browsers and proxies may keep the results of a GET search, in seconds
+SEARCH_MAX_AGE = 5 * 60
+
+# the text search configuration used for the vectors and the queries
+SEARCH_CONFIG = 'english'
+
+# postgres drops the HTML tags and entities of the Redactor fields when it splits them into words.
+# The title counts most, then the heading and symptom name, then the text, then the description
+_REFRESH_SQL = '''UPDATE "iPoorly_subheading" SET search_vector =
+    setweight(to_tsvector(%s::regconfig, coalesce("iPoorly_subheading"."title", '')), 'A') ||
+    setweight(to_tsvector(%s::regconfig, coalesce("iPoorly_heading"."text", '')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, replace(coalesce("iPoorly_category"."categoryName", ''), '_', ' ')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, coalesce("iPoorly_subheading"."text", '')), 'C') ||
+    setweight(to_tsvector(%s::regconfig, coalesce("iPoorly_category"."description", '')), 'D')
+FROM "iPoorly_heading" INNER JOIN "iPoorly_category"
+    ON "iPoorly_category"."categoryId" = "iPoorly_heading"."categoryName_id"
+WHERE "iPoorly_heading"."headingId" = "iPoorly_subheading"."headingId_id"'''
+
+_REFRESH_FILTERS = {
+    'sub_heading_id': ' AND "iPoorly_subheading"."subHeadingId" = %s',
+    'heading_id': ' AND "iPoorly_heading"."headingId" = %s',
+    'category_id': ' AND "iPoorly_category"."categoryId" = %s',
+}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_query(query):
+    """ the query in lower case ascii with single spaces, so that queries which only differ in case,
+    spacing or accents share their cached results """
+    return _WHITESPACE_RE.sub(' ', unidecode(query or '')).strip().lower()
+
+def get_empty_timeout():
+    """ how long a search without results is cached. Kept short so that the cache is not filled
+    up with misspelt queries """
+    return getattr(settings, 'SEARCH_EMPTY_CACHE_TIMEOUT', 5*60)
+
+def cached_search(backend, query, age_group, limit=search_index.MAX_RESULTS):
+    """ the ids returned by a backend for a normalised query, cached until the content changes """
+    key = make_key(SEARCH, backend.__name__, query, age_group, limit)
+    sub_heading_ids = cache.get(key)
+    if sub_heading_ids is None:
+        sub_heading_ids = backend(query, age_group, limit)
+        cache.set(key, sub_heading_ids, get_timeout() if sub_heading_ids else get_empty_timeout())
+    return sub_heading_ids
+
+def uses_postgres():
+    """ whether the database supports the postgres backend """
+    return connection.vendor == 'postgresql'
+
+def get_backend():
+    """ the search backend to use. The search vectors follow the saved content, so the index, which is
+    built from the published content, is used when the content is published by hand """
+    backend = getattr(settings, 'SEARCH_BACKEND', INDEX)
+    if backend == POSTGRES and (not uses_postgres() or not auto_publish()):
+        return INDEX
+    return backend
+
+def refresh_search_vectors(sub_heading_id=None, heading_id=None, category_id=None):
+    """ rebuild the search vectors of one subheading, of the subheadings of a heading or a symptom,
+    or of every subheading. Does nothing on databases other than postgres """
+    if not uses_postgres():
+        return
+    sql = _REFRESH_SQL
+    params = [SEARCH_CONFIG] * 5
+    for name, value in (('sub_heading_id', sub_heading_id), ('heading_id', heading_id), ('category_id', category_id)):
+        if value is not None:
+            sql += _REFRESH_FILTERS[name]
+            params.append(value)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+def postgres_search(query, age_group, limit=search_index.MAX_RESULTS):
+    """ the ids of the best matching subheadings for an age group, best first, in one query """
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    in_age_group = SubHeading.ageGroup.through.objects.filter(agegroup__age_group=age_group).values('subheading_id')
+    sub_headings = SubHeading.objects.filter(search_vector=search_query, subHeadingId__in=in_age_group)\
+    .annotate(rank=SearchRank(F('search_vector'), search_query)).order_by('-rank', 'subHeadingId')
+    return list(sub_headings.values_list('subHeadingId', flat=True)[:limit])
+
+def postgres_count(query, age_group, limit=None):
+    # pylint: disable=W0613
+    """ how many subheadings for an age group match a query, in one query. Takes a limit like the
+    other backends so that it is cached by cached_search """
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    in_age_group = SubHeading.ageGroup.through.objects.filter(agegroup__age_group=age_group).values('subheading_id')
+    return SubHeading.objects.filter(search_vector=search_query, subHeadingId__in=in_age_group).count()
+
+def search(query, age_group, limit=search_index.MAX_RESULTS):
+    """ the ids of the best matching subheadings for a query and an age group, best first. The index
+    is searched in memory which is quicker than reading the cache, so only the postgres results
+    are cached """
+    query = normalize_query(query)
+    if not query:
+        return []
+    if get_backend() == POSTGRES:
+        return cached_search(postgres_search, query, int(age_group), limit)
+    return search_index.search(query, age_group, limit)
+
+def search_page(query, age_group, page, size=PAGE_SIZE):
+    """ one page of the ids of the best matching subheadings for a query and an age group, best
+    first, and how many subheadings match in all. Any page of the results can be reached, the
+    postgres backend ranks the matches up to the end of the page and counts them apart """
+    query = normalize_query(query)
+    if not query:
+        return [], 0
+    offset = (page - 1) * size
+    if get_backend() == POSTGRES:
+        age_group = int(age_group)
+        sub_heading_ids = cached_search(postgres_search, query, age_group, offset + size)[offset:]
+        return sub_heading_ids, cached_search(postgres_count, query, age_group)
+    return search_index.search_page(query, age_group, offset, size)
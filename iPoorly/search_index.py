@@ -0,0 +1,137 @@
+""" In-process inverted index used by the search view. Every subheading is indexed with the words of
+its title and text, the text of its heading and the name and description of its symptom, after
+the Redactor HTML is stripped and accents are removed. The index is split by age group so a
+search only looks at the subheadings shown for the age group of the user. It is built from the
+content snapshot (see content.py) and rebuilt when a new snapshot is swapped in, reusing the words
+of every subheading which did not change. A search returns the ids of the best matching
+subheadings, the view then only loads those from the database """
+import bisect
+import heapq
+import threading
+from .content import get_snapshot
+from .text import tokenize
+
+# the most subheadings returned by a search
+MAX_RESULTS = 50
+
+# how much a word counts for in each field of a subheading, in the order returned by _fields
+FIELD_WEIGHTS = (4, 3, 3, 1, 1)
+
+# a word of the query which is only the start of a word of a subheading counts for less
+PREFIX_FACTOR = 0.5
+
+def _fields(sub_heading):
+    """ the text of a subheading node which is searched """
+    heading = sub_heading.headingId
+    category = heading.categoryName
+    return (sub_heading.title, heading.text, category.categoryName, category.description, sub_heading.text)
+
+def document_weights(fields):
+    """ the weight of every word in the fields of a subheading """
+    weights = {}
+    for field, weight in zip(fields, FIELD_WEIGHTS):
+        for word in set(tokenize(field)):
+            weights[word] = weights.get(word, 0) + weight
+    return weights
+
+class SearchIndex(object):
+    """ the index of one content snapshot. Never changed once built """
+    __slots__ = ('version', 'documents', '_postings', '_words')
+
+    def __init__(self, version, documents, age_groups):
+        self.version = version
+        # subHeadingId -> (fields, word weights), kept so that the next index can reuse them
+        self.documents = documents
+        # age group -> word -> {subHeadingId: weight}
+        self._postings = {}
+        for age_group, sub_heading_ids in age_groups.items():
+            postings = self._postings.setdefault(age_group, {})
+            for sub_heading_id in sub_heading_ids:
+                for word, weight in documents[sub_heading_id][1].items():
+                    postings.setdefault(word, {})[sub_heading_id] = weight
+        # age group -> sorted words, to find the words starting with a prefix
+        self._words = {age_group: sorted(postings) for age_group, postings in self._postings.items()}
+
+    def _matches(self, word, age_group):
+        """ the score of every subheading with a word starting with word """
+        postings = self._postings.get(age_group, {})
+        words = self._words.get(age_group, [])
+        scores = {}
+        position = bisect.bisect_left(words, word)
+        while position < len(words) and words[position].startswith(word):
+            match = words[position]
+            factor = 1 if match == word else PREFIX_FACTOR
+            for sub_heading_id, weight in postings[match].items():
+                scores[sub_heading_id] = max(scores.get(sub_heading_id, 0), weight * factor)
+            position += 1
+        return scores
+
+    def _scores(self, query, age_group):
+        """ the score of every subheading for an age group which matches every word of the query """
+        words = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not words:
+            return {}
+        scores = None
+        # the longest words match the fewest subheadings so they are looked up first
+        for word in words:
+            matches = self._matches(word, age_group)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {sub_heading_id: scores[sub_heading_id] + score for sub_heading_id, score in matches.items() \
+                if sub_heading_id in scores}
+            if not scores:
+                return {}
+        return scores
+
+    def search(self, query, age_group, limit=MAX_RESULTS):
+        """ the ids of the subheadings for an age group which match every word of the query, best first """
+        return self.search_page(query, age_group, 0, limit)[0]
+
+    def search_page(self, query, age_group, offset, size):
+        """ size of the ids of the matching subheadings from offset, best first, and how many
+        subheadings match in all. Only the matches up to the end of the page are sorted """
+        scores = self._scores(query, age_group)
+        ranked = heapq.nsmallest(offset + size, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [sub_heading_id for sub_heading_id, _ in ranked[offset:]], len(scores)
+
+def build_index(snapshot, previous=None):
+    """ build the index of a snapshot. The words of a subheading are only worked out again if its
+    fields changed since the previous index """
+    previous_documents = previous.documents if previous is not None else {}
+    documents = {}
+    for sub_heading in snapshot.sub_headings:
+        fields = _fields(sub_heading)
+        document = previous_documents.get(sub_heading.subHeadingId)
+        if document is None or document[0] != fields:
+            document = (fields, document_weights(fields))
+        documents[sub_heading.subHeadingId] = document
+    age_groups = {}
+    for age_group, sub_headings in snapshot.sub_headings_by_age_group():
+        age_groups[age_group] = [sub_heading.subHeadingId for sub_heading in sub_headings]
+    return SearchIndex(snapshot.version, documents, age_groups)
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def get_index():
+    """ the index of the current snapshot. Rebuilt at most once per worker per content version """
+    global _INDEX # pylint: disable=W0603
+    snapshot = get_snapshot()
+    index = _INDEX
+    if index is not None and index.version == snapshot.version:
+        return index
+    with _INDEX_LOCK:
+        index = _INDEX
+        if index is None or index.version != snapshot.version:
+            index = build_index(snapshot, index)
+            _INDEX = index
+    return index
+
+def search(query, age_group, limit=MAX_RESULTS):
+    """ the ids of the best matching subheadings for a query and an age group """
+    return get_index().search(query, int(age_group), limit)
+
+def search_page(query, age_group, offset, size):
+    """ one page of the ids of the best matching subheadings and how many subheadings match """
+    return get_index().search_page(query, int(age_group), offset, size)
@@ -0,0 +1,92 @@
+""" Service functions that change models on behalf of the views. Kept out of views.py so that the
+same code can be called in-process by several views and the django admin, instead of a view making
+an HTTP call back to another view """
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import Child, ContentRelease
+from .cache_namespace import CONTENT, bump, child_namespace, get_version
+from .content import load_rows, compress_rows, build_snapshot, release_version, share_release, install_snapshot, \
+switch_release
+
+def _children_changed(user_ids):
+    """ update() does not send post_save, so make the cached active child of the users stale here """
+    bump(*[child_namespace(user_id) for user_id in set(user_ids)])
+
+def bulk_set_activation(child_ids, activate=True):
+    """ activate or deactivate many children in a constant number of queries. A user can only have
+    one active child, so when activating, the other children of that user are deactivated and if
+    several ids belong to the same user the last one wins. Returns the number of children changed """
+    child_ids = [int(child_id) for child_id in child_ids]
+    if not child_ids:
+        return 0
+    # the children of each user are bumped after the update and again on commit (see bump), so a
+    # request in between cannot cache the old active child under the new version
+    if not activate:
+        with transaction.atomic():
+            children = Child.objects.filter(id__in=child_ids)
+            users = list(children.values_list('username', flat=True))
+            changed = children.update(activate=False)
+            _children_changed(users)
+        return changed
+    with transaction.atomic():
+        owners = dict(Child.objects.filter(id__in=child_ids).values_list('id', 'username'))
+        chosen = {}
+        for child_id in child_ids:
+            if child_id in owners:
+                chosen[owners[child_id]] = child_id
+        if not chosen:
+            return 0
+        Child.objects.filter(Q(username__in=list(chosen.keys())) & Q(activate=True))\
+        .exclude(id__in=list(chosen.values())).update(activate=False)
+        changed = Child.objects.filter(id__in=list(chosen.values())).update(activate=True)
+        _children_changed(chosen.keys())
+    return changed
+
+def activate_child(user, child_id):
+    """ make a child the active child for a user. Returns False if the child does not belong to the user """
+    with transaction.atomic():
+        if not Child.objects.filter(Q(id=child_id) & Q(username=user)).exists():
+            return False
+        bulk_set_activation([child_id])
+    return True
+
+def add_child(user, child_name, dob):
+    """ create a new child for a user and make it the active child """
+    with transaction.atomic():
+        child = Child.objects.create(username=user, childName=child_name, dob=dob, activate=False)
+        activate_child(user, child.id)
+        child.activate = True
+    return child
+
+def delete_child(user, child_id):
+    """ delete a child of a user. If the active child is deleted another child of the user becomes
+    active. Returns False if the child does not exist or does not belong to the user """
+    with transaction.atomic():
+        child = Child.objects.filter(Q(id=child_id) & Q(username=user)).first()
+        if child is None:
+            return False
+        child.delete()
+        if child.activate:
+            new_child = Child.objects.filter(username=user).values_list('id', flat=True).first()
+            if new_child is not None:
+                bulk_set_activation([new_child])
+    return True
+
+def publish_content(user=None):
+    """ publish the content as saved by the editors as a new release. The rows are read in one
+    transaction (repeatable read on postgres) so the release is a consistent tree even while other
+    editors are saving. The rows are shared through the cache and the snapshot of this worker is
+    built before the readers are switched to the new release """
+    consistent = not connection.in_atomic_block
+    with transaction.atomic():
+        if consistent and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        version = get_version(CONTENT)
+        rows = load_rows()
+        payload = compress_rows(rows)
+        release = ContentRelease.objects.create(publishedBy=user, contentVersion=version, rows=payload)
+    share_release(release.releaseId, payload)
+    install_snapshot(build_snapshot(release_version(release.releaseId), rows))
+    switch_release(release.releaseId)
+    return release
@@ -0,0 +1,87 @@
+""" Session engine used by the project (SESSION_ENGINE in settings.py). Most visitors do not log in
+and only keep a few small flags in their session (whether they read the disclaimer and the age
+they picked). Those sessions are kept in a signed cookie like django's signed_cookies engine, so
+anonymous traffic does not read or write any session storage. As soon as anything else is put in
+a session (e.g. the user logs in) it is moved to the database with memcached in front, like
+django's cached_db engine. Together with ThrottledSessionMiddleware a session is written at most
+once every SESSION_REFRESH_INTERVAL seconds instead of on every request """
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core import signing
+
+# the time (in seconds since the epoch) the session was last written
+REFRESHED_SESSION_KEY = '_refreshed'
+
+# the only keys a session kept in a cookie may have
+COOKIE_SESSION_KEYS = frozenset(['disclaimer', 'age_range', REFRESHED_SESSION_KEY])
+
+COOKIE_SALT = 'iPoorly.session_store'
+
+def get_refresh_interval():
+    """ the least number of seconds between two writes of an unchanged session """
+    return getattr(settings, 'SESSION_REFRESH_INTERVAL', 5*60)
+
+def is_signed_key(session_key):
+    """ the key of a cookie session is the signed session data. Keys of database sessions are made
+    of letters and digits only while signed values always have a ':' in them """
+    return bool(session_key) and ':' in session_key
+
+class SessionStore(CachedDBStore):
+    """ a session kept either in a signed cookie or in the database. A session may not be written
+    again until the refresh interval has passed, so it is kept for the interval on top of
+    SESSION_COOKIE_AGE. A session then expires between SESSION_COOKIE_AGE and SESSION_COOKIE_AGE +
+    SESSION_REFRESH_INTERVAL seconds after the last request """
+
+    def _default_expiry(self, kwargs):
+        """ use the cookie age plus the refresh interval unless an expiry was given or set """
+        if 'expiry' not in kwargs and not self.get('_session_expiry'):
+            kwargs['expiry'] = settings.SESSION_COOKIE_AGE + get_refresh_interval()
+        return kwargs
+
+    def get_expiry_age(self, **kwargs):
+        return super(SessionStore, self).get_expiry_age(**self._default_expiry(kwargs))
+
+    def get_expiry_date(self, **kwargs):
+        return super(SessionStore, self).get_expiry_date(**self._default_expiry(kwargs))
+
+    def _keep_in_cookie(self):
+        """ a session stays in a cookie while it only has the small anonymous flags. Once it is in
+        the database it stays there. An empty session is only saved when the code needs its key
+        before putting anything in it (e.g. the test client), so that one goes to the database """
+        if self.session_key is not None and not is_signed_key(self.session_key):
+            return False
+        return bool(self._session) and set(self._session.keys()) <= COOKIE_SESSION_KEYS
+
+    def load(self):
+        if not is_signed_key(self.session_key):
+            return super(SessionStore, self).load()
+        try:
+            return signing.loads(self.session_key, salt=COOKIE_SALT, serializer=self.serializer, \
+            max_age=settings.SESSION_COOKIE_AGE + get_refresh_interval())
+        except Exception: # pylint: disable=W0703
+            # a bad signature or an expired cookie starts a new, empty session
+            self._session_key = None
+            return {}
+
+    def exists(self, session_key):
+        if is_signed_key(session_key):
+            return False
+        return super(SessionStore, self).exists(session_key)
+
+    def save(self, must_create=False):
+        if self._keep_in_cookie():
+            self._session_key = signing.dumps(self._session, compress=True, salt=COOKIE_SALT, serializer=self.serializer)
+            return
+        if is_signed_key(self.session_key):
+            # moving to the database, a new key is made for the session
+            self._session_key = None
+        super(SessionStore, self).save(must_create)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is None or is_signed_key(session_key):
+            # a cookie session is deleted with the cookie
+            return
+        super(SessionStore, self).delete(session_key)
+
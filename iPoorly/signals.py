@@ -0,0 +1,82 @@
+""" Signal handlers which keep the cached content in step with the database. Each change bumps the
+cache namespaces of everything that shows the changed object. The pages and searches are built from
+the whole content (see content.py), so any change to it bumps CONTENT and SEARCH. Connected in apps.py """
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.auth.models import User, Group
+from .models import Category, Heading, SubHeading, AgeGroup, Child
+from .cache_namespace import CONTENT, SEARCH, ROLES, bump, category_namespace, child_namespace, roles_namespace
+from .search_backends import refresh_search_vectors
+
+def category_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ a symptom is shown in the content and searched, and its edit form is cached under its name """
+    bump(CONTENT, SEARCH, category_namespace(instance.categoryName))
+
+def content_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ headings, subheadings and age groups are shown in the content and searched """
+    bump(CONTENT, SEARCH)
+
+def age_groups_changed(sender, action, **kwargs):
+    # pylint: disable=W0613
+    """ changing the age groups of a subheading changes which pages and searches show it """
+    if action.startswith('post_'):
+        bump(CONTENT, SEARCH)
+
+def child_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ the active child of a user is kept in their session until one of their children changes """
+    bump(child_namespace(instance.username_id))
+
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # pylint: disable=W0613, R0913
+    """ the roles of a user are kept in their session until their groups change """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True)) # pylint: disable=W0212
+        return
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_user_ids', [])
+    else:
+        user_ids = pk_set or []
+    bump(*[roles_namespace(user_id) for user_id in user_ids])
+
+def group_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ renaming or deleting a group changes the roles of all its users """
+    bump(ROLES)
+
+def category_words_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ the name and description of a symptom are searched with each of its subheadings """
+    refresh_search_vectors(category_id=instance.pk)
+
+def heading_words_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ the text of a heading is searched with each of its subheadings """
+    refresh_search_vectors(heading_id=instance.pk)
+
+def sub_heading_words_changed(sender, instance, **kwargs):
+    # pylint: disable=W0613
+    """ the title and text of a subheading are searched """
+    refresh_search_vectors(sub_heading_id=instance.pk)
+
+def connect_signals():
+    """ connect the handlers to the content models """
+    post_save.connect(category_changed, sender=Category, dispatch_uid='category_changed_save')
+    post_delete.connect(category_changed, sender=Category, dispatch_uid='category_changed_delete')
+    for model in (Heading, SubHeading, AgeGroup):
+        post_save.connect(content_changed, sender=model, dispatch_uid='%s_changed_save' % model.__name__.lower())
+        post_delete.connect(content_changed, sender=model, dispatch_uid='%s_changed_delete' % model.__name__.lower())
+    for model, handler in ((Category, category_words_changed), (Heading, heading_words_changed), \
+    (SubHeading, sub_heading_words_changed)):
+        post_save.connect(handler, sender=model, dispatch_uid=handler.__name__)
+    post_save.connect(child_changed, sender=Child, dispatch_uid='child_changed_save')
+    post_delete.connect(child_changed, sender=Child, dispatch_uid='child_changed_delete')
+    m2m_changed.connect(user_groups_changed, sender=User.groups.through, dispatch_uid='user_groups_changed')
+    post_save.connect(group_changed, sender=Group, dispatch_uid='group_changed_save')
+    post_delete.connect(group_changed, sender=Group, dispatch_uid='group_changed_delete')
+    m2m_changed.connect(age_groups_changed, sender=SubHeading.ageGroup.through, dispatch_uid='age_groups_changed')
@@ -0,0 +1,43 @@
+""" Short plain text snippets for the search results. The plain text of a subheading is worked out
+from its Redactor HTML when it is saved (SubHeading.plainText), a snippet is the part of it around
+the first word matching the query, with the offsets of every matching word so that the page can
+highlight them """
+import re
+from .text import tokenize
+
+# the most characters of plain text in a snippet, without the ellipses
+SNIPPET_LENGTH = 200
+
+ELLIPSIS = '…'
+
+def _words_pattern(query):
+    """ a pattern matching the words of a text which start with a word of the query """
+    words = tokenize(query)
+    if not words:
+        return None
+    return re.compile(r'\b(?:%s)\w*' % '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)), \
+    re.IGNORECASE)
+
+def make_snippet(text, query, length=SNIPPET_LENGTH):
+    """ the part of a plain text around the first match of the query and the [start, end] offsets of
+    the matching words in it. Starts and ends at a space unless the text is shorter than length """
+    pattern = _words_pattern(query)
+    match = pattern.search(text) if pattern is not None else None
+    start = 0
+    if match is not None and match.start() > length // 4:
+        # show a little of the text before the first match
+        start = text.rfind(' ', 0, match.start() - length // 4) + 1
+    end = start + length
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        if space > start:
+            end = space
+    snippet = text[start:end].strip()
+    if start > 0:
+        snippet = ELLIPSIS + snippet
+    if end < len(text):
+        snippet += ELLIPSIS
+    highlights = []
+    if pattern is not None:
+        highlights = [[word.start(), word.end()] for word in pattern.finditer(snippet)]
+    return snippet, highlights
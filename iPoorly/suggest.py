@@ -0,0 +1,93 @@
+""" Search suggestions shown while the user types a search query. Every symptom name, heading text
+and subheading title of the content snapshot is kept in a sorted list once for each of its words,
+so that a prefix of any word, e.g. 'inj' for 'Head Injury', is found with a binary search. The
+list is rebuilt when a new snapshot is swapped in (see content.py) """
+import bisect
+import threading
+from .content import get_snapshot
+from .text import tokenize
+
+# how many suggestions are returned
+MAX_SUGGESTIONS = 8
+
+# how long the browser may keep the suggestions for a prefix, in seconds
+SUGGEST_MAX_AGE = 5 * 60
+
+# how many entries starting with the prefix are looked at before the best ones are picked
+MAX_SCANNED = 500
+
+# suggestions of the same quality are listed symptoms first, then headings, then subheadings
+CATEGORY, HEADING, SUB_HEADING = range(3)
+
+class Suggestions(object):
+    """ the suggestions of one content snapshot. Never changed once built """
+    __slots__ = ('version', '_keys', '_entries')
+
+    def __init__(self, version, entries):
+        self.version = version
+        # entries are (key, starts the text, kind, text, url, age groups or None for all age groups)
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+
+    def suggest(self, prefix, age_group=None, limit=MAX_SUGGESTIONS):
+        """ the texts and urls starting with prefix or with a word starting with prefix, best first """
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+        found = {}
+        position = bisect.bisect_left(self._keys, prefix)
+        end = min(len(self._keys), position + MAX_SCANNED)
+        while position < end and self._keys[position].startswith(prefix):
+            _, starts, kind, text, url, age_groups = self._entries[position]
+            if age_group is None or age_groups is None or age_group in age_groups:
+                rank = (not starts, kind, len(text), text, url)
+                # the same text is only suggested once, e.g. a title used under several headings
+                if text not in found or rank < found[text][0]:
+                    found[text] = (rank, url)
+            position += 1
+        best = sorted((rank, text, url) for text, (rank, url) in found.items())[:limit]
+        return [{'text':text, 'url':url} for _, text, url in best]
+
+def _entries(kind, text, url, age_groups=None):
+    """ an entry for every word of a text """
+    words = tokenize(text)
+    for position in range(len(words)):
+        yield (' '.join(words[position:]), position == 0, kind, text, url, age_groups)
+
+def build_suggestions(snapshot):
+    """ build the suggestions of a snapshot """
+    age_groups = {}
+    for age_group, sub_headings in snapshot.sub_headings_by_age_group():
+        for sub_heading in sub_headings:
+            age_groups.setdefault(sub_heading.subHeadingId, set()).add(age_group)
+    entries = []
+    for category in snapshot.categories:
+        entries.extend(_entries(CATEGORY, str(category), category.get_absolute_url()))
+    for heading in snapshot.headings:
+        entries.extend(_entries(HEADING, heading.text, heading.get_absolute_url()))
+    for sub_heading in snapshot.sub_headings:
+        entries.extend(_entries(SUB_HEADING, sub_heading.title, sub_heading.get_absolute_url(), \
+        frozenset(age_groups.get(sub_heading.subHeadingId, ()))))
+    return Suggestions(snapshot.version, entries)
+
+_SUGGESTIONS = None
+_SUGGESTIONS_LOCK = threading.Lock()
+
+def get_suggestions():
+    """ the suggestions of the current snapshot. Rebuilt at most once per worker per content version """
+    global _SUGGESTIONS # pylint: disable=W0603
+    snapshot = get_snapshot()
+    suggestions = _SUGGESTIONS
+    if suggestions is not None and suggestions.version == snapshot.version:
+        return suggestions
+    with _SUGGESTIONS_LOCK:
+        suggestions = _SUGGESTIONS
+        if suggestions is None or suggestions.version != snapshot.version:
+            suggestions = build_suggestions(snapshot)
+            _SUGGESTIONS = suggestions
+    return suggestions
+
+def suggest(prefix, age_group=None, limit=MAX_SUGGESTIONS):
+    """ the best suggestions for what the user has typed so far """
+    return get_suggestions().suggest(prefix, age_group, limit)
@@ -0,0 +1,70 @@
+""" Unit tests for admin.py """
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.urlresolvers import reverse
+from django.contrib.auth.models import User
+from iPoorly.models import Child, Category, Heading, SubHeading, AgeGroup, DiaryLog
+
+class ChangelistTest(TestCase):
+    """ unit tests for the records tables of the django admin """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='ChangelistTest', password='Test', email='email@email.com')
+        self.client.login(username='ChangelistTest', password='Test')
+        self.age_groups = [AgeGroup.objects.create(age_group=age_group) for age_group in range(3)]
+        self.count = 0
+        # the first request also loads the user and the session
+        self.client.get(reverse('admin:index'))
+
+    def add_rows(self, count):
+        """ add count rows to every table """
+        for _ in range(count):
+            self.count += 1
+            category = Category.objects.create(categoryName='Symptom %d' % self.count, description='<p>About <b>it</b></p>')
+            heading = Heading.objects.create(categoryName=category, text='Heading %d' % self.count)
+            sub_heading = SubHeading.objects.create(headingId=heading, title='Title %d' % self.count, \
+            text='<p>%s</p>' % ('word ' * 100))
+            sub_heading.ageGroup.add(*self.age_groups[:2])
+            child = Child.objects.create(username=self.admin, childName='Child %d' % self.count)
+            DiaryLog.objects.create(child=child, title='Diary %d' % self.count, text='entry ' * 100)
+
+    def changelist_queries(self, model):
+        """ the queries run to show the records table of a model, and the response """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:iPoorly_%s_changelist' % model))
+        self.assertEqual(response.status_code, 200)
+        return queries.captured_queries, response
+
+    def test_constant_queries(self):
+        """ test that the records tables run as many queries for many rows as for one """
+        self.add_rows(1)
+        few = {model: len(self.changelist_queries(model)[0]) for model in ('child', 'category', 'heading', 'subheading', 'diarylog')}
+        self.add_rows(5)
+        many = {model: len(self.changelist_queries(model)[0]) for model in ('child', 'category', 'heading', 'subheading', 'diarylog')}
+        self.assertEqual(few, many)
+
+    def test_previews(self):
+        """ test that the records tables show the start of the text without HTML """
+        self.add_rows(1)
+        _, response = self.changelist_queries('subheading')
+        self.assertContains(response, 'less than 1 month, 1-3 months')
+        self.assertContains(response, ('word ' * 15).strip())
+        self.assertNotContains(response, ('word ' * 20).strip())
+        _, response = self.changelist_queries('category')
+        self.assertContains(response, 'About it')
+        self.assertNotContains(response, '&lt;b&gt;')
+
+    def test_big_fields_not_loaded(self):
+        """ test that only the start of the previewed fields is read and the foreign keys are joined """
+        self.add_rows(1)
+        Category.objects.update(description='<p>%s</p>' % ('long ' * 1000))
+        queries, response = self.changelist_queries('category')
+        self.assertContains(response, ('long ' * 10).strip())
+        sql = [query['sql'] for query in queries if 'FROM "iPoorly_category"' in query['sql']]
+        # the description is only read through SUBSTR
+        self.assertFalse(any('"iPoorly_category"."description"' in statement.replace('SUBSTR("iPoorly_category"."description"', '') \
+        for statement in sql))
+        self.assertFalse(any('COUNT' in statement and 'GROUP BY' in statement for statement in sql))
+        queries, _ = self.changelist_queries('heading')
+        self.assertTrue(any('JOIN "iPoorly_category"' in query['sql'] for query in queries))
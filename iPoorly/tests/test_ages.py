@@ -0,0 +1,52 @@
+""" Unit tests for ages.py and the refresh_age_groups command """
+import datetime
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from iPoorly.models import Child
+from iPoorly.ages import get_age_group, next_boundary, get_age_record, store_age_record, get_cached_age_record, \
+children_crossing_boundary
+
+class AgeGroupBoundaryTest(TestCase):
+    """ unit tests for working out when the age group of a child changes """
+
+    def test_boundary_matches_age_group(self):
+        """ test that the age group is the same up to the boundary and changes on the boundary """
+        dob = datetime.date(2017, 1, 20)
+        today = datetime.date(2017, 1, 25)
+        while next_boundary(dob, today) is not None:
+            boundary = next_boundary(dob, today)
+            day_before = boundary - datetime.timedelta(days=1)
+            self.assertEqual(get_age_group(dob, today), get_age_group(dob, day_before))
+            self.assertNotEqual(get_age_group(dob, day_before), get_age_group(dob, boundary))
+            today = boundary
+        self.assertEqual(today, datetime.date(2022, 2, 1))
+
+    def test_first_boundary(self):
+        """ test that a newborn changes age group when they are two calendar months old """
+        record = get_age_record(datetime.date(2017, 12, 31), datetime.date(2018, 1, 1))
+        self.assertEqual(record.age_group, 0)
+        self.assertEqual(record.valid_until, datetime.date(2018, 2, 1))
+
+    def test_cached_record(self):
+        """ test that the record is cached per child """
+        dob = datetime.date.today() - datetime.timedelta(days=100)
+        record = store_age_record(1, dob)
+        self.assertEqual(record, get_cached_age_record(1, dob))
+        self.assertEqual(record.age_group, get_age_group(dob))
+
+class RefreshAgeGroupsCommandTest(TestCase):
+    """ unit tests for the refresh_age_groups management command """
+
+    def setUp(self):
+        user = User.objects.create_user(username='AgesTest', password='Test')
+        year, month = children_crossing_boundary()[0]
+        Child.objects.create(username=user, childName='Crossing', dob=datetime.date(year, month, 15))
+        Child.objects.create(username=user, childName='Not crossing', dob=datetime.date.today())
+
+    def test_refresh(self):
+        """ test that only the children crossing a boundary this month are refreshed """
+        out = StringIO()
+        call_command('refresh_age_groups', stdout=out)
+        self.assertIn('Refreshed the age group of 1 children', out.getvalue())
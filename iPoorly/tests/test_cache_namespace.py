@@ -0,0 +1,58 @@
+""" Unit tests for cache_namespace.py and the signal handlers which bump the namespaces """
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.cache_namespace import CONTENT, SEARCH, make_key, get_version, bump, category_namespace
+
+class CacheNamespaceTest(TestCase):
+    """ unit tests for building and bumping namespaced keys """
+
+    def test_key_is_safe(self):
+        """ test that keys stay short and free of spaces and control characters whatever the parts are """
+        key = make_key(SEARCH, 'a very long query with spaces \n and symbols %$£' * 20, 0)
+        self.assertLess(len(key), 100)
+        self.assertNotIn(' ', key)
+        self.assertNotEqual(make_key(SEARCH, 'a b', 0), make_key(SEARCH, 'ab', 0))
+
+    def test_bump_changes_key(self):
+        """ test that bumping a namespace changes its keys but not the keys of other namespaces """
+        search_key = make_key(SEARCH, 'query')
+        content_key = make_key(CONTENT, 'query')
+        bump(SEARCH)
+        self.assertNotEqual(search_key, make_key(SEARCH, 'query'))
+        self.assertEqual(content_key, make_key(CONTENT, 'query'))
+
+class NamespaceSignalTest(TestCase):
+    """ unit tests for the namespaces bumped when content changes """
+
+    def setUp(self):
+        self.age_group = AgeGroup.objects.create(age_group=0)
+        self.category = Category.objects.create(categoryName='Namespace Test', description='')
+        self.category_2 = Category.objects.create(categoryName='Namespace Test 2', description='')
+        self.heading = Heading.objects.create(categoryName=self.category, text='Namespace heading')
+        self.heading_2 = Heading.objects.create(categoryName=self.category_2, text='Namespace heading 2')
+        self.sub_heading = SubHeading.objects.create(headingId=self.heading, title='Namespace title', text='Namespace text')
+
+    def test_rename_category(self):
+        """ test that renaming a symptom bumps the content, the search results and the namespace of its new name """
+        versions = [get_version(x) for x in (CONTENT, SEARCH, category_namespace('renamed'))]
+        self.category.categoryName = 'renamed'
+        self.category.save()
+        self.assertNotEqual(versions, [get_version(x) for x in (CONTENT, SEARCH, category_namespace('renamed'))])
+
+    def test_move_sub_heading(self):
+        """ test that moving a subheading bumps the content without reading the database """
+        version = get_version(CONTENT)
+        self.sub_heading.headingId = self.heading_2
+        with CaptureQueriesContext(connection) as context:
+            self.sub_heading.save()
+        self.assertEqual([], [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')])
+        self.assertNotEqual(version, get_version(CONTENT))
+
+    def test_change_age_groups(self):
+        """ test that adding an age group to a subheading bumps the content and the search results """
+        versions = [get_version(x) for x in (CONTENT, SEARCH)]
+        self.sub_heading.ageGroup.add(self.age_group)
+        self.assertNotEqual(versions[0], get_version(CONTENT))
+        self.assertNotEqual(versions[1], get_version(SEARCH))
@@ -0,0 +1,125 @@
+""" Unit tests for content.py """
+import pickle
+import zlib
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup, ContentRelease
+from iPoorly.content import get_snapshot, load_snapshot, load_rows, build_snapshot, dump_rows, compress_rows, \
+release_version, switch_release
+from iPoorly.services import publish_content
+from iPoorly import content
+from iPoorly.cache_namespace import CONTENT, get_version
+
+class ContentSnapshotTest(TestCase):
+    """ unit tests for the in-memory content snapshot """
+
+    def setUp(self):
+        self.age_group_0 = AgeGroup.objects.create(age_group=0)
+        self.age_group_1 = AgeGroup.objects.create(age_group=1)
+        self.category = Category.objects.create(categoryName='Snapshot Test', description='This is a test for the snapshot')
+        self.heading = Heading.objects.create(categoryName=self.category, text='Snapshot heading')
+        self.sub_heading = SubHeading.objects.create(headingId=self.heading, title='Snapshot title', text='Snapshot text')
+        self.sub_heading.ageGroup.add(self.age_group_0)
+
+    def test_load_queries(self):
+        """ test the whole tree is loaded with a constant number of queries """
+        with self.assertNumQueries(4):
+            load_rows()
+
+    def test_shared_rows(self):
+        """ test that once one worker has loaded a version the others build it without any query """
+        version = get_version(CONTENT)
+        load_snapshot(version)
+        with self.assertNumQueries(0):
+            snapshot = load_snapshot(version)
+        self.assertEqual(self.heading.text, snapshot.heading(self.heading.headingId).text)
+
+    def test_rows_round_trip(self):
+        """ test that the serialised rows build the same snapshot as the rows loaded from the database """
+        rows = load_rows()
+        payload = dump_rows(rows)
+        self.assertEqual(rows, pickle.loads(zlib.decompress(payload)))
+        snapshot = build_snapshot(1, pickle.loads(zlib.decompress(payload)))
+        self.assertEqual(str(self.sub_heading), str(snapshot.sub_headings[0]))
+
+    def test_indexes(self):
+        """ test the snapshot can be looked up by category name, heading id and age group """
+        snapshot = get_snapshot()
+        category = snapshot.category('snapshot_test')
+        self.assertEqual(category.description, self.category.description)
+        self.assertEqual([self.heading.headingId], [heading.headingId for heading in category.headings])
+        heading = snapshot.heading(str(self.heading.headingId))
+        self.assertEqual(str(heading.categoryName), str(self.category))
+        self.assertEqual([self.sub_heading.subHeadingId], [x.subHeadingId for x in snapshot.sub_headings_for(self.heading.headingId, '0')])
+        self.assertEqual((), snapshot.sub_headings_for(self.heading.headingId, 1))
+        self.assertEqual(str(self.sub_heading), str(snapshot.sub_headings[0]))
+
+    def test_no_queries_when_current(self):
+        """ test that an up to date snapshot is returned without querying the database """
+        snapshot = get_snapshot()
+        with self.assertNumQueries(0):
+            self.assertIs(snapshot, get_snapshot())
+            # the changes are published as they are saved, so the saved content is the same snapshot
+            self.assertIs(snapshot, get_snapshot(live=True))
+
+    def test_reload_after_change(self):
+        """ test that changing the content swaps in a new snapshot """
+        snapshot = get_snapshot()
+        self.heading.text = 'Renamed heading'
+        self.heading.save()
+        new_snapshot = get_snapshot()
+        self.assertIsNot(snapshot, new_snapshot)
+        self.assertEqual(new_snapshot.heading(self.heading.headingId).text, 'Renamed heading')
+        self.sub_heading.ageGroup.add(self.age_group_1)
+        self.assertEqual(1, len(get_snapshot().sub_headings_for(self.heading.headingId, 1)))
+
+@override_settings(CONTENT_AUTO_PUBLISH=False)
+class ContentReleaseTest(TestCase):
+    """ unit tests for showing the readers the published release """
+
+    def setUp(self):
+        cache.clear()
+        age_group = AgeGroup.objects.create(age_group=0)
+        self.category = Category.objects.create(categoryName='Release Test', description='This is a test for the releases')
+        self.heading = Heading.objects.create(categoryName=self.category, text='Published heading')
+        self.sub_heading = SubHeading.objects.create(headingId=self.heading, title='Published title', text='<p>Published text</p>')
+        self.sub_heading.ageGroup.add(age_group)
+
+    def test_saved_before_first_release(self):
+        """ test that the saved content is shown until the first release """
+        self.heading.text = 'Saved heading'
+        self.heading.save()
+        self.assertEqual('Saved heading', get_snapshot().heading(self.heading.headingId).text)
+
+    def test_draft(self):
+        """ test that changes are only shown to the readers once they are published """
+        publish_content()
+        self.heading.text = 'Draft heading'
+        self.heading.save()
+        self.sub_heading.delete()
+        snapshot = get_snapshot()
+        self.assertEqual('Published heading', snapshot.heading(self.heading.headingId).text)
+        self.assertEqual(1, len(snapshot.sub_headings_for(self.heading.headingId, 0)))
+        self.assertEqual('Published text', snapshot.sub_headings[0].plainText)
+        live = get_snapshot(live=True)
+        self.assertEqual('Draft heading', live.heading(self.heading.headingId).text)
+        self.assertEqual((), live.sub_headings_for(self.heading.headingId, 0))
+        publish_content()
+        self.assertEqual('Draft heading', get_snapshot().heading(self.heading.headingId).text)
+
+    def test_switch_without_query(self):
+        """ test that the other workers load a new release from the cache """
+        release = publish_content()
+        content._SNAPSHOTS.clear() # pylint: disable=W0212
+        with self.assertNumQueries(0):
+            snapshot = get_snapshot()
+        self.assertEqual(release_version(release.releaseId), snapshot.version)
+
+    def test_release_from_database(self):
+        """ test that a release which is not in the cache is read from the database """
+        rows = load_rows()
+        release = ContentRelease.objects.create(rows=compress_rows(rows))
+        switch_release(release.releaseId)
+        snapshot = get_snapshot()
+        self.assertEqual(release_version(release.releaseId), snapshot.version)
+        self.assertEqual(str(self.sub_heading), str(snapshot.sub_headings[0]))
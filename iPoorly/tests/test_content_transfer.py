@@ -0,0 +1,131 @@
+""" Unit tests for content_transfer.py and the content_export and content_import commands """
+import os
+import tempfile
+from io import StringIO
+import simplejson
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.content_transfer import export_lines, import_lines
+from iPoorly.cache_namespace import CONTENT, get_version
+
+class ContentTransferTest(TestCase):
+    """ unit tests for exporting and importing the content tree """
+
+    def setUp(self):
+        self.baby = AgeGroup.objects.create(age_group=0)
+        self.toddler = AgeGroup.objects.create(age_group=1)
+        self.category = Category.objects.create(categoryName='Fever', description='<p>Hot</p>')
+        self.heading = Heading.objects.create(categoryName=self.category, text='High temperature')
+        self.sub_headings = []
+        for number in range(5):
+            sub_heading = SubHeading.objects.create(headingId=self.heading, title='Title %d' % number, \
+            text='<p>Text <b>%d</b></p>' % number)
+            sub_heading.ageGroup.add(self.baby)
+            self.sub_headings.append(sub_heading)
+        self.sub_headings[0].ageGroup.add(self.toddler)
+
+    def export(self):
+        """ the lines written by content_export """
+        out = StringIO()
+        call_command('content_export', stdout=out)
+        return out.getvalue().splitlines()
+
+    def test_export(self):
+        """ test that the rows are written parents first with the age groups of the subheadings """
+        lines = [simplejson.loads(line) for line in self.export()]
+        self.assertEqual(['agegroup'] * 2 + ['category', 'heading'] + ['subheading'] * 5, [line['model'] for line in lines])
+        self.assertEqual({'model':'subheading', 'pk':self.sub_headings[0].pk, 'heading':self.heading.pk, 'title':'Title 0', \
+        'text':'<p>Text <b>0</b></p>', 'ageGroups':[self.baby.pk, self.toddler.pk]}, lines[4])
+        self.assertEqual(lines, [simplejson.loads(line) for line in export_lines(batch_size=2)])
+
+    def test_round_trip(self):
+        """ test that an export imported into an empty database gives the same content """
+        lines = self.export()
+        Category.objects.all().delete()
+        AgeGroup.objects.all().delete()
+        version = get_version(CONTENT)
+        stats = import_lines(lines, batch_size=2)
+        self.assertEqual(5, stats.counts['subheading']['created'])
+        self.assertEqual(lines, self.export())
+        self.assertEqual('Text 3', SubHeading.objects.get(pk=self.sub_headings[3].pk).plainText)
+        self.assertNotEqual(version, get_version(CONTENT))
+        # the next row gets a new primary key
+        Category.objects.create(categoryName='Rash', description='Spots')
+
+    def test_upsert(self):
+        """ test that only the changed rows are updated and the age groups are replaced """
+        lines = [simplejson.loads(line) for line in self.export()]
+        lines[4]['title'] = 'New title'
+        lines[4]['ageGroups'] = [self.toddler.pk]
+        lines[5]['text'] = '<p>New text</p>'
+        lines.append({'model':'subheading', 'pk':self.sub_headings[-1].pk + 1, 'heading':self.heading.pk, \
+        'title':'Added', 'text':'<p>Added text</p>', 'ageGroups':[self.baby.pk]})
+        stats = import_lines([simplejson.dumps(line) for line in lines])
+        self.assertEqual({'created':1, 'updated':2, 'unchanged':3}, stats.counts['subheading'])
+        self.assertEqual({'created':0, 'updated':0, 'unchanged':1}, stats.counts['category'])
+        sub_heading = SubHeading.objects.get(pk=self.sub_headings[0].pk)
+        self.assertEqual('New title', sub_heading.title)
+        self.assertEqual([self.toddler], list(sub_heading.ageGroup.all()))
+        self.assertEqual('New text', SubHeading.objects.get(pk=self.sub_headings[1].pk).plainText)
+        self.assertEqual('Added text', SubHeading.objects.get(title='Added').plainText)
+
+    def test_upsert_queries(self):
+        """ test that a batch costs the same queries however many of its rows changed """
+        def changed(count):
+            """ the lines with the title and the age groups of the first count subheadings changed """
+            lines = [simplejson.loads(line) for line in self.export()]
+            for line in lines[4:4 + count]:
+                line['title'] += ' %d' % count
+                line['ageGroups'] = [self.toddler.pk]
+            return [simplejson.dumps(line) for line in lines]
+        queries = []
+        for count in (1, 5):
+            lines = changed(count)
+            with CaptureQueriesContext(connection) as context:
+                stats = import_lines(lines)
+            self.assertEqual(count, stats.counts['subheading']['updated'])
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+        self.assertEqual('Title 4 5', SubHeading.objects.get(pk=self.sub_headings[4].pk).title)
+        self.assertEqual([self.toddler], list(SubHeading.objects.get(pk=self.sub_headings[4].pk).ageGroup.all()))
+
+    def test_failed_batch(self):
+        """ test that the caches are refreshed for the batches saved before a batch which failed """
+        lines = [simplejson.loads(line) for line in self.export()]
+        lines[2]['description'] = '<p>Very hot</p>'
+        lines[4]['title'] = None
+        version = get_version(CONTENT)
+        self.assertRaises(IntegrityError, import_lines, [simplejson.dumps(line) for line in lines])
+        self.assertEqual('<p>Very hot</p>', Category.objects.get(pk=self.category.pk).description)
+        self.assertEqual('Title 0', SubHeading.objects.get(pk=self.sub_headings[0].pk).title)
+        self.assertNotEqual(version, get_version(CONTENT))
+
+    def test_import_command(self):
+        """ test the command reading a file and rejecting lines it cannot read """
+        lines = self.export()
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        try:
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write('\n'.join(lines) + '\n')
+            out = StringIO()
+            call_command('content_import', path, stdout=out)
+            self.assertIn('subheading: 0 created, 0 updated, 5 unchanged', out.getvalue())
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write('\n'.join(reversed(lines)))
+            self.assertRaises(CommandError, call_command, 'content_import', path, stdout=out)
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write('{"model": "category", "pk": 1}')
+            self.assertRaises(CommandError, call_command, 'content_import', path, stdout=out)
+            lines = [simplejson.loads(line) for line in lines]
+            lines[5]['heading'] = self.heading.pk + 100
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write('\n'.join(simplejson.dumps(line) for line in lines))
+            with self.assertRaisesRegex(CommandError, 'line 6: no heading %d' % (self.heading.pk + 100)):
+                call_command('content_import', path, stdout=out)
+        finally:
+            os.remove(path)
@@ -0,0 +1,55 @@
+""" Unit tests for diary.py """
+from django.test import TestCase
+from django.contrib.auth.models import User
+from iPoorly.models import Child, DiaryLog
+from iPoorly.diary import diary_page, encode_cursor, decode_cursor
+
+class DiaryPageTest(TestCase):
+    """ unit tests for the pages of the diary of a child """
+
+    def setUp(self):
+        user = User.objects.create_user(username='DiaryPageTest', password='Test', email='email@email.com')
+        self.child = Child.objects.create(username=user, childName='DiaryPage Child', dob='2017-06-26', activate=True)
+        other = Child.objects.create(username=user, childName='Other Child', dob='2016-06-26', activate=True)
+        DiaryLog.objects.create(child=other, text='Other diary')
+        for number in range(7):
+            DiaryLog.objects.create(child=self.child, text='Diary Entry %d' % number)
+        self.logs = list(DiaryLog.objects.filter(child=self.child).order_by('-diary_id'))
+
+    def test_pages(self):
+        """ test that the pages cover the whole diary of the child, newest first, without repeats """
+        logs, cursor = diary_page(self.child, size=3)
+        self.assertEqual(self.logs[:3], logs)
+        pages = [logs]
+        while cursor:
+            logs, cursor = diary_page(self.child, cursor, size=3)
+            pages.append(logs)
+        self.assertEqual([self.logs[:3], self.logs[3:6], self.logs[6:]], pages)
+
+    def test_edit_keeps_position(self):
+        """ test that editing an entry while the diary is read does not move it to another page """
+        _, cursor = diary_page(self.child, size=3)
+        edited = self.logs[4]
+        edited.text = 'Edited Diary Entry'
+        edited.save()
+        logs, _ = diary_page(self.child, cursor, size=3)
+        self.assertEqual([log.diary_id for log in self.logs[3:6]], [log.diary_id for log in logs])
+
+    def test_last_page_has_no_cursor(self):
+        """ test that a diary which fits on a page has no next page """
+        logs, cursor = diary_page(self.child, size=7)
+        self.assertEqual(self.logs, logs)
+        self.assertIsNone(cursor)
+
+    def test_constant_queries(self):
+        """ test that a page is one query whatever page it is """
+        _, cursor = diary_page(self.child, size=2)
+        with self.assertNumQueries(1):
+            diary_page(self.child, cursor, size=2)
+
+    def test_cursor(self):
+        """ test that a cursor is the position of an entry and that a bad cursor is refused """
+        self.assertEqual(self.logs[0].diary_id, decode_cursor(encode_cursor(self.logs[0])))
+        for cursor in ('not a cursor', '-1', '0', '9' * 30):
+            self.assertRaises(ValueError, decode_cursor, cursor)
+        self.assertRaises(ValueError, diary_page, self.child, '1_2')
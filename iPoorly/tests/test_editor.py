@@ -0,0 +1,37 @@
+""" Unit tests for editor.py """
+from django.test import TestCase
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.editor import load_category_tree, coverage_grid
+
+class CategoryTreeTest(TestCase):
+    """ unit tests for loading the headings and subheadings of a symptom """
+
+    def setUp(self):
+        self.baby = AgeGroup.objects.create(age_group=0)
+        self.toddler = AgeGroup.objects.create(age_group=1)
+        self.category = Category.objects.create(categoryName='Fever', description='Hot')
+        self.first = Heading.objects.create(categoryName=self.category, text='High temperature')
+        self.second = Heading.objects.create(categoryName=self.category, text='Shivering')
+        for heading in (self.first, self.second):
+            for title in ('Call 999', 'Call 111', 'Self care'):
+                sub_heading = SubHeading.objects.create(headingId=heading, title=title, text='<p>%s</p>' % title)
+                sub_heading.ageGroup.add(self.baby)
+                if heading == self.first:
+                    sub_heading.ageGroup.add(self.toddler)
+        other = Category.objects.create(categoryName='Rash', description='Spots')
+        Heading.objects.create(categoryName=other, text='Purple spots')
+
+    def test_constant_queries(self):
+        """ test that the whole symptom is loaded in three queries however many subheadings it has """
+        with self.assertNumQueries(3):
+            headings = load_category_tree(self.category)
+            titles = [[str(sub_heading) for sub_heading in heading.sub_headings] for heading in headings]
+        self.assertEqual([self.first, self.second], headings)
+        self.assertEqual(3, len(titles[0]))
+
+    def test_coverage_grid(self):
+        """ test the number of subheadings of each heading for each age group """
+        rows, totals = coverage_grid(load_category_tree(self.category))
+        self.assertEqual([(self.first, [3, 3, 0, 0, 0, 0]), (self.second, [3, 0, 0, 0, 0, 0])], rows)
+        self.assertEqual([6, 3, 0, 0, 0, 0], totals)
+        self.assertEqual(([], [0, 0, 0, 0, 0, 0]), coverage_grid([]))
@@ -0,0 +1,45 @@
+""" Unit tests for fuzzy.py """
+from django.test import TestCase
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.fuzzy import BKTree, edit_distance, correct
+
+class BKTreeTest(TestCase):
+    """ unit tests for the edit distance and the BK-tree """
+
+    def test_edit_distance(self):
+        """ test the number of insertions, deletions and substitutions between two words """
+        self.assertEqual(0, edit_distance('fever', 'fever'))
+        self.assertEqual(1, edit_distance('vommiting', 'vomiting'))
+        self.assertEqual(2, edit_distance('diarhea', 'diarrhoea'))
+        self.assertEqual(3, edit_distance('kitten', 'sitting'))
+
+    def test_search(self):
+        """ test that every word within the limit is found and no other """
+        tree = BKTree(['fever', 'fewer', 'never', 'rash', 'vomiting', 'temperature'])
+        self.assertEqual([(1, 'fever'), (2, 'fewer'), (2, 'never')], sorted(tree.search('fevr', 2)))
+        self.assertEqual([(1, 'temperature')], tree.search('temprature', 2))
+        self.assertEqual([], BKTree([]).search('rash', 2))
+
+class CorrectTest(TestCase):
+    """ unit tests for correcting search queries """
+
+    def setUp(self):
+        age_group = AgeGroup.objects.create(age_group=0)
+        category = Category.objects.create(categoryName='Diarrhoea and Vomiting', description='Tummy bugs')
+        heading = Heading.objects.create(categoryName=category, text='High temperature')
+        sub_heading = SubHeading.objects.create(headingId=heading, title='Vomiting blood', text='<p>Call paracetamol 111</p>')
+        sub_heading.ageGroup.add(age_group)
+
+    def test_misspelt_words(self):
+        """ test that misspelt words are replaced by the closest word """
+        self.assertEqual('diarrhoea', correct('diarhea'))
+        self.assertEqual('high temperature', correct('High temprature'))
+        self.assertEqual('vomiting', correct('vommiting'))
+        self.assertEqual('blood', correct('blod'))
+
+    def test_known_words(self):
+        """ test that words in the content, the start of words and short words are left alone """
+        self.assertEqual('Paracetamol', correct('Paracetamol'))
+        self.assertEqual('temp', correct('temp'))
+        self.assertEqual('bld', correct('bld'))
+        self.assertEqual('xylophone', correct('xylophone'))
@@ -0,0 +1,40 @@
+""" Unit tests for links.py """
+import gzip
+import simplejson
+from django.test import TestCase
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.links import PLACEHOLDER, get_links
+
+class LinksTest(TestCase):
+    """ unit tests for the links to the content """
+
+    def setUp(self):
+        self.age_group = AgeGroup.objects.create(age_group=0)
+        self.category = Category.objects.create(categoryName='Links Test', description='This is a test for the links')
+        self.heading = Heading.objects.create(categoryName=self.category, text='Links heading')
+        self.sub_heading = SubHeading.objects.create(headingId=self.heading, title='Links title', text='Links text')
+        self.sub_heading.ageGroup.add(self.age_group)
+
+    def test_links(self):
+        """ test the links to every symptom, heading and subheading, and the encoded defined links """
+        expected = [
+            {'name':'Symptom: Links Test', 'url':'/symptom/links_test'},
+            {'name':'Heading: Links heading', 'url':'/symptom/information/%s' % self.heading.headingId},
+            {'name':'Sub Heading: Links title (less than 1 month)', 'url':'/symptom/information/%s#%s' % \
+            (self.heading.headingId, self.sub_heading.subHeadingId)},
+        ]
+        links = get_links()
+        self.assertEqual(expected, links.links)
+        self.assertEqual([PLACEHOLDER] + expected, simplejson.loads(links.body.decode('utf-8')))
+        self.assertEqual(links.body, gzip.decompress(links.gzipped))
+
+    def test_rebuilt(self):
+        """ test that the links are kept until the content changes, without any query """
+        links = get_links()
+        with self.assertNumQueries(0):
+            self.assertIs(links, get_links())
+        self.heading.text = 'Renamed heading'
+        self.heading.save()
+        rebuilt = get_links()
+        self.assertNotEqual(links.etag, rebuilt.etag)
+        self.assertIn({'name':'Heading: Renamed heading', 'url':self.heading.get_absolute_url()}, rebuilt.links)
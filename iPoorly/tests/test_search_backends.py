@@ -0,0 +1,95 @@
+""" Unit tests for search_backends.py """
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.search_backends import INDEX, POSTGRES, get_backend, refresh_search_vectors, search, normalize_query, cached_search
+
+class SearchBackendTest(TestCase):
+    """ unit tests for picking and using a search backend """
+
+    def setUp(self):
+        age_group_0 = AgeGroup.objects.create(age_group=0)
+        age_group_1 = AgeGroup.objects.create(age_group=1)
+        self.category = Category.objects.create(categoryName='Backend Test', description='Looking after a poorly child')
+        self.heading = Heading.objects.create(categoryName=self.category, text='When to see a doctor')
+        self.title_match = SubHeading.objects.create(headingId=self.heading, title='Rash', text='<p>Call 111</p>')
+        self.text_match = SubHeading.objects.create(headingId=self.heading, title='Fever', text='<p>A <b>rash</b> that does not fade</p>')
+        self.title_match.ageGroup.add(age_group_0)
+        self.text_match.ageGroup.add(age_group_0, age_group_1)
+
+    @override_settings(SEARCH_BACKEND=POSTGRES)
+    def test_backend_setting(self):
+        """ test that the postgres backend is only used on postgres """
+        self.assertEqual(POSTGRES if connection.vendor == 'postgresql' else INDEX, get_backend())
+
+    @override_settings(SEARCH_BACKEND=POSTGRES)
+    def test_search(self):
+        """ test that either backend ranks title matches first and filters by age group """
+        self.assertEqual([self.title_match.subHeadingId, self.text_match.subHeadingId], search('rash', 0))
+        self.assertEqual([self.text_match.subHeadingId], search('rash', '1'))
+        self.assertEqual([], search('rash', 2))
+
+    @skipUnless(connection.vendor != 'postgresql', 'only other databases skip the search vectors')
+    def test_no_vectors(self):
+        """ test that the search vectors are not refreshed on other databases """
+        with self.assertNumQueries(0):
+            refresh_search_vectors()
+
+    @skipUnless(connection.vendor == 'postgresql', 'the search vectors need postgres')
+    @override_settings(SEARCH_BACKEND=POSTGRES)
+    def test_vectors_follow_changes(self):
+        """ test that changing a heading or a symptom refreshes the vectors of its subheadings """
+        self.heading.text = 'Breathing problems'
+        self.heading.save()
+        self.assertEqual([self.title_match.subHeadingId, self.text_match.subHeadingId], search('breathing', 0))
+        self.category.description = 'Meningitis'
+        self.category.save()
+        self.assertEqual([self.text_match.subHeadingId], search('meningitis', 1))
+
+class SearchCacheTest(TestCase):
+    """ unit tests for normalising and caching search queries """
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def backend(self, query, age_group, limit):
+        """ a backend which records its calls and only finds 'rash' """
+        self.calls.append(query)
+        return [1, 2] if query == 'rash' else []
+
+    def test_normalize_query(self):
+        """ test that case, spacing and accents are normalised but the words are kept apart """
+        self.assertEqual('fievre rash', normalize_query('  Fi\u00e8vre \t RASH '))
+        self.assertNotEqual(normalize_query('a b'), normalize_query('ab'))
+
+    def test_results_cached(self):
+        """ test that results and empty results are both cached """
+        self.assertEqual([1, 2], cached_search(self.backend, 'rash', 0))
+        self.assertEqual([1, 2], cached_search(self.backend, 'rash', 0))
+        self.assertEqual([], cached_search(self.backend, 'rsah', 0))
+        self.assertEqual([], cached_search(self.backend, 'rsah', 0))
+        self.assertEqual(['rash', 'rsah'], self.calls)
+
+    def test_long_query(self):
+        """ test that a query longer than a memcached key can be cached """
+        query = 'rash ' * 100
+        cached_search(self.backend, query, 0)
+        cached_search(self.backend, query, 0)
+        self.assertEqual([query], self.calls)
+
+    @override_settings(SEARCH_EMPTY_CACHE_TIMEOUT=0)
+    def test_empty_results_timeout(self):
+        """ test that empty results use their own timeout """
+        cached_search(self.backend, 'rsah', 0)
+        cached_search(self.backend, 'rsah', 0)
+        self.assertEqual(['rsah', 'rsah'], self.calls)
+
+    def test_content_change(self):
+        """ test that cached results are dropped when the content changes """
+        cached_search(self.backend, 'rash', 0)
+        AgeGroup.objects.create(age_group=0)
+        cached_search(self.backend, 'rash', 0)
+        self.assertEqual(['rash', 'rash'], self.calls)
@@ -0,0 +1,75 @@
+""" Unit tests for search_index.py """
+from django.test import TestCase
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.content import get_snapshot
+from iPoorly.search_index import tokenize, build_index, get_index, search, search_page, MAX_RESULTS
+
+class TokenizeTest(TestCase):
+    """ unit tests for splitting content into words """
+
+    def test_html_stripped(self):
+        """ test that tags and entities are removed and the words are lower case ascii """
+        self.assertEqual(['high', 'fever', 'cafe', 'nausea'], tokenize('<p><b>High</b>&nbsp;fever</p> Caf&eacute; NAUSEA'))
+
+    def test_category_name(self):
+        """ test that symptom names are split on underscores """
+        self.assertEqual(['head', 'injury'], tokenize('head_injury'))
+
+class SearchIndexTest(TestCase):
+    """ unit tests for the inverted index """
+
+    def setUp(self):
+        self.age_group_0 = AgeGroup.objects.create(age_group=0)
+        self.age_group_1 = AgeGroup.objects.create(age_group=1)
+        self.category = Category.objects.create(categoryName='Index Test', description='Looking after a poorly child')
+        self.heading = Heading.objects.create(categoryName=self.category, text='When to see a doctor')
+        self.title_match = SubHeading.objects.create(headingId=self.heading, title='Rash', text='<p>Call 111</p>')
+        self.text_match = SubHeading.objects.create(headingId=self.heading, title='Fever', text='<p>A <b>rash</b> that does not fade</p>')
+        self.title_match.ageGroup.add(self.age_group_0)
+        self.text_match.ageGroup.add(self.age_group_0, self.age_group_1)
+
+    def test_ranked_by_field(self):
+        """ test that a match in the title ranks above a match in the text """
+        self.assertEqual([self.title_match.subHeadingId, self.text_match.subHeadingId], search('rash', 0))
+
+    def test_search_page(self):
+        """ test that a page of the results is counted over every match, past MAX_RESULTS """
+        for number in range(MAX_RESULTS):
+            SubHeading.objects.create(headingId=self.heading, title='Rash %d' % number, text='').ageGroup.add(self.age_group_0)
+        ranked = search('rash', 0, MAX_RESULTS + 2)
+        self.assertEqual(MAX_RESULTS + 2, len(ranked))
+        self.assertEqual((ranked[MAX_RESULTS - 1:], MAX_RESULTS + 2), search_page('rash', 0, MAX_RESULTS - 1, 10))
+        self.assertEqual(([], 0), search_page('nothing', 0, 0, 10))
+
+    def test_age_group(self):
+        """ test that only the subheadings of the age group are returned """
+        self.assertEqual([self.text_match.subHeadingId], search('rash', '1'))
+        self.assertEqual([], search('rash', 2))
+
+    def test_every_word_matches(self):
+        """ test that all the words of the query have to match, in any field and as the start of a word """
+        self.assertEqual([self.text_match.subHeadingId], search('doct fade', 0))
+        self.assertEqual([], search('doctor nothing', 0))
+        self.assertEqual([], search('<p>', 0))
+
+    def test_no_queries(self):
+        """ test that a search on a current index does not query the database """
+        get_index()
+        with self.assertNumQueries(0):
+            search('poorly child', 0)
+
+    def test_rebuilt_after_change(self):
+        """ test that the index follows changes to the content """
+        search('rash', 0)
+        self.text_match.title = 'Meningitis'
+        self.text_match.save()
+        self.assertEqual([self.text_match.subHeadingId], search('meningitis', 1))
+
+    def test_unchanged_documents_reused(self):
+        """ test that rebuilding the index only works out the words of changed subheadings again """
+        index = build_index(get_snapshot())
+        self.text_match.title = 'Meningitis'
+        self.text_match.save()
+        new_index = build_index(get_snapshot(), index)
+        self.assertIs(index.documents[self.title_match.subHeadingId], new_index.documents[self.title_match.subHeadingId])
+        self.assertIsNot(index.documents[self.text_match.subHeadingId], new_index.documents[self.text_match.subHeadingId])
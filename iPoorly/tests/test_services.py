@@ -0,0 +1,76 @@
+""" Unit tests for services.py """
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth.models import User
+from iPoorly.models import Child, Category, Heading
+from iPoorly.services import bulk_set_activation, activate_child, publish_content
+from iPoorly.content import get_snapshot, current_version
+from iPoorly.cache_namespace import CONTENT, get_version, child_namespace
+
+class ChildActivationTest(TestCase):
+    """ unit tests for activating and deactivating children """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ServicesTest', password='Test')
+        self.other_user = User.objects.create_user(username='ServicesTest2', password='Test')
+        self.child_1 = Child.objects.create(username=self.user, childName='Child 1', dob='2017-06-26', activate=True)
+        self.child_2 = Child.objects.create(username=self.user, childName='Child 2', dob='2017-06-26')
+        self.child_3 = Child.objects.create(username=self.other_user, childName='Child 3', dob='2017-06-26')
+
+    def active_ids(self):
+        """ ids of all the active children """
+        return set(Child.objects.filter(activate=True).values_list('id', flat=True))
+
+    def test_activate_child(self):
+        """ test that activating a child deactivates the other children of the user """
+        self.assertTrue(activate_child(self.user, self.child_2.id))
+        self.assertEqual(self.active_ids(), {self.child_2.id})
+
+    def test_activate_child_other_user(self):
+        """ test that a child of another user cannot be activated """
+        self.assertFalse(activate_child(self.user, self.child_3.id))
+        self.assertEqual(self.active_ids(), {self.child_1.id})
+
+    def test_bulk_activate(self):
+        """ test that bulk activation keeps one active child per user """
+        # select, deactivate and activate plus the savepoint and release of the transaction
+        with self.assertNumQueries(5):
+            bulk_set_activation([self.child_1.id, self.child_2.id, self.child_3.id])
+        self.assertEqual(self.active_ids(), {self.child_2.id, self.child_3.id})
+
+    def test_bulk_deactivate(self):
+        """ test that bulk deactivation uses a constant number of queries and makes the cached active
+        child of the users stale again once the transaction commits """
+        version = get_version(child_namespace(self.user.pk))
+        callbacks = len(connection.run_on_commit)
+        # select and deactivate plus the savepoint and release of the transaction
+        with self.assertNumQueries(4):
+            changed = bulk_set_activation([self.child_1.id, self.child_3.id], activate=False)
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.active_ids(), set())
+        self.assertNotEqual(version, get_version(child_namespace(self.user.pk)))
+        self.assertEqual(callbacks + 1, len(connection.run_on_commit))
+
+@override_settings(CONTENT_AUTO_PUBLISH=False)
+class PublishContentTest(TestCase):
+    """ unit tests for publishing the content as a release """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='PublishTest', password='Test')
+        category = Category.objects.create(categoryName='Fever', description='Hot')
+        self.heading = Heading.objects.create(categoryName=category, text='High temperature')
+
+    def test_publish(self):
+        """ test that the readers are switched to the new release at once """
+        self.assertEqual(current_version(), get_version(CONTENT))
+        release = publish_content(self.user)
+        self.assertEqual(self.user, release.publishedBy)
+        self.assertEqual(get_version(CONTENT), release.contentVersion)
+        self.assertEqual('release:%d' % release.releaseId, current_version())
+        with self.assertNumQueries(0):
+            snapshot = get_snapshot()
+        self.assertEqual(current_version(), snapshot.version)
+        self.assertEqual('High temperature', snapshot.heading(self.heading.headingId).text)
+        self.assertEqual(release.releaseId + 1, publish_content().releaseId)
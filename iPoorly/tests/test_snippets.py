@@ -0,0 +1,44 @@
+""" Unit tests for snippets.py and text.py """
+from django.test import TestCase
+from iPoorly.models import Category, Heading, SubHeading
+from iPoorly.snippets import make_snippet, ELLIPSIS
+from iPoorly.text import html_to_text
+
+class PlainTextTest(TestCase):
+    """ unit tests for the plain text of a subheading """
+
+    def test_html_to_text(self):
+        """ test that tags and entities are removed and block elements keep words apart """
+        self.assertEqual('Fever & rash Call 111', html_to_text('<p>Fever &amp;&nbsp;rash</p><ul><li>Call</li><li>111</li></ul>'))
+
+    def test_saved(self):
+        """ test that the plain text is worked out when a subheading is saved """
+        category = Category.objects.create(categoryName='Snippet Test', description='Snippet test')
+        heading = Heading.objects.create(categoryName=category, text='Snippet heading')
+        sub_heading = SubHeading.objects.create(headingId=heading, title='Snippet title', text='<p>Some <b>bold</b> text</p>')
+        self.assertEqual('Some bold text', SubHeading.objects.get(pk=sub_heading.pk).plainText)
+
+class SnippetTest(TestCase):
+    """ unit tests for the search result snippets """
+
+    def test_short_text(self):
+        """ test that a short text is returned whole with the matching words highlighted """
+        snippet, highlights = make_snippet('A rash with a high fever', 'fev Rash')
+        self.assertEqual('A rash with a high fever', snippet)
+        self.assertEqual([[2, 6], [19, 24]], highlights)
+        self.assertEqual(['rash', 'fever'], [snippet[start:end] for start, end in highlights])
+
+    def test_match_far_in(self):
+        """ test that the snippet of a long text starts shortly before the first match """
+        text = 'word ' * 100 + 'meningitis ' + 'word ' * 100
+        snippet, highlights = make_snippet(text.strip(), 'meningitis', 100)
+        self.assertTrue(snippet.startswith(ELLIPSIS))
+        self.assertTrue(snippet.endswith(ELLIPSIS))
+        self.assertLessEqual(len(snippet), 100 + 2 * len(ELLIPSIS))
+        self.assertEqual(['meningitis'], [snippet[start:end] for start, end in highlights])
+
+    def test_no_match(self):
+        """ test that the start of the text is used when no word matches """
+        snippet, highlights = make_snippet('word ' * 100, 'rash', 20)
+        self.assertEqual('word word word word' + ELLIPSIS, snippet)
+        self.assertEqual([], highlights)
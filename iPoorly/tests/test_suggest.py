@@ -0,0 +1,50 @@
+""" Unit tests for suggest.py """
+from django.test import TestCase
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly.suggest import suggest
+
+class SuggestTest(TestCase):
+    """ unit tests for the search suggestions """
+
+    def setUp(self):
+        age_group_0 = AgeGroup.objects.create(age_group=0)
+        age_group_1 = AgeGroup.objects.create(age_group=1)
+        self.category = Category.objects.create(categoryName='Head Injury', description='Bumps to the head')
+        self.heading = Heading.objects.create(categoryName=self.category, text='Headaches after a fall')
+        self.sub_heading = SubHeading.objects.create(headingId=self.heading, title='When to call 999', text='Call 999')
+        self.other_heading = Heading.objects.create(categoryName=self.category, text='Mild injuries')
+        self.other_sub_heading = SubHeading.objects.create(headingId=self.other_heading, title='When to call 999', text='Call')
+        self.sub_heading.ageGroup.add(age_group_0)
+        self.other_sub_heading.ageGroup.add(age_group_1)
+
+    def test_prefix_of_first_word(self):
+        """ test that texts starting with the prefix come first, symptoms before headings """
+        self.assertEqual([
+            {'text':'Head Injury', 'url':self.category.get_absolute_url()},
+            {'text':'Headaches after a fall', 'url':self.heading.get_absolute_url()},
+        ], suggest('HEAD'))
+
+    def test_prefix_of_other_word(self):
+        """ test that a prefix of a later word is found, after the texts starting with it """
+        self.assertEqual(['Head Injury', 'Mild injuries'], [suggestion['text'] for suggestion in suggest('inj')])
+        Heading.objects.create(categoryName=self.category, text='Injuries at home')
+        self.assertEqual(['Injuries at home', 'Head Injury', 'Mild injuries'], [suggestion['text'] for suggestion in suggest('inj')])
+        self.assertEqual(['Head Injury'], [suggestion['text'] for suggestion in suggest('head inj')])
+
+    def test_age_group(self):
+        """ test that subheading titles are only suggested for their age groups and only once """
+        self.assertEqual([self.sub_heading.get_absolute_url()], [suggestion['url'] for suggestion in suggest('call', 0)])
+        self.assertEqual([self.other_sub_heading.get_absolute_url()], [suggestion['url'] for suggestion in suggest('call', 1)])
+        self.assertEqual([], suggest('call', 2))
+        self.assertEqual(1, len(suggest('call')))
+
+    def test_empty_prefix(self):
+        """ test that nothing is suggested without a word """
+        self.assertEqual([], suggest(' - '))
+
+    def test_follows_changes(self):
+        """ test that the suggestions are rebuilt when the content changes """
+        suggest('head')
+        self.heading.text = 'Concussion'
+        self.heading.save()
+        self.assertEqual(['Concussion'], [suggestion['text'] for suggestion in suggest('conc')])
@@ -1,10 +1,21 @@
 """ Unit tests for models.py """
 import datetime
-from django.test import TestCase
+import gzip
+import simplejson
+import time
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User, Group
-from iPoorly.models import Child, DiaryLog, Category, Heading, SubHeading, AgeGroup
+from django.contrib.sessions.models import Session
+from iPoorly.models import Child, DiaryLog, Category, Heading, SubHeading, AgeGroup, ContentRelease
 from iPoorly.forms import HeadingEditForm, SubHeadingEditForm
+from iPoorly.snippets import make_snippet
+from iPoorly import warmup, content, search_backends, search_index
+from iPoorly.diary import PAGE_SIZE
+from iPoorly.session_store import REFRESHED_SESSION_KEY
 
 class IndexView(TestCase):
     """ unit tests for the index view """
@@ -346,6 +357,30 @@ class ChildView(TestCase):
             {'status': 1}
         )
 
+    def test_add_child_becomes_active(self):
+        """ test that a newly added child is made the only active child of the user """
+        dob = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+        self.client.post(reverse('myChild'), {'childName':'ChildView Child 3', 'dob':dob, 'add':''})
+        new_child = Child.objects.get(childName='ChildView Child 3')
+        self.assertTrue(new_child.activate)
+        self.assertFalse(Child.objects.get(id=self.child.id).activate)
+
+    def test_child_activate_other_user(self):
+        """ test that a user cannot activate a child of another user """
+        other_user = User.objects.create_user(username='ChildViewOther', password='Test')
+        other_child = Child.objects.create(username=other_user, childName='Other Child', dob='2017-06-26')
+        response = self.client.post(reverse('child_activate'), {'id':other_child.id})
+        self.assertJSONEqual(str(response.content, encoding='utf8'), {'status': 0})
+        self.assertFalse(Child.objects.get(id=other_child.id).activate)
+        self.assertTrue(Child.objects.get(id=self.child.id).activate)
+
+    def test_delete_active_child(self):
+        """ test that deleting the active child makes another child of the user active """
+        other_child = Child.objects.create(username=self.user, childName='ChildView Child Other', dob='2017-06-26')
+        response = self.client.post(reverse('child_delete'), {'id':self.child.id})
+        self.assertJSONEqual(str(response.content, encoding='utf8'), {'status': 1})
+        self.assertTrue(Child.objects.get(id=other_child.id).activate)
+
     def test_child_delete(self):
         """ test that we can delete a child for a user """
         new_child = Child.objects.create(username=self.user, childName='ChildView Child Delete', dob='2017-06-26')
@@ -417,6 +452,42 @@ class DiaryView(TestCase):
         response = self.client.get(reverse('diary_logs', kwargs={'child_id':self.child.id}))
         self.assertNotIn(new_diary_log, response.context['logs'])
 
+    def test_diary_logs_page(self):
+        """ test that the diary is loaded a page at a time, newest entry first """
+        for number in range(PAGE_SIZE):
+            DiaryLog.objects.create(child=self.child, text='Diary Entry %d' % (number + 2))
+        response = self.client.get(reverse('diary_logs', kwargs={'child_id':self.child.id}))
+        self.assertEqual(PAGE_SIZE, len(response.context['logs']))
+        self.assertNotIn(self.diary_log_1, response.context['logs'])
+        self.assertIsNotNone(response.context['next'])
+        response = self.client.get(reverse('diary_logs_page', kwargs={'child_id':self.child.id}), \
+        {'after':response.context['next']})
+        data = simplejson.loads(response.content.decode('utf-8'))
+        self.assertEqual(1, data['status'])
+        self.assertIn('id="diary%d"' % self.diary_log_1.diary_id, data['html'])
+        self.assertIsNone(data['next'])
+
+    def test_diary_logs_page_refused(self):
+        """ test that a bad cursor or the diary of another parent are refused """
+        url = reverse('diary_logs_page', kwargs={'child_id':self.child.id})
+        self.assertJSONEqual(str(self.client.get(url, {'after':'bad'}).content, encoding='utf8'), {'status':0})
+        self.assertJSONEqual(str(self.client.get(url, {'after':'9' * 30}).content, encoding='utf8'), {'status':0})
+        User.objects.create_user(username='DiaryViewOther', password='Test', email='other@email.com')
+        self.client.login(username='DiaryViewOther', password='Test')
+        self.assertJSONEqual(str(self.client.get(url).content, encoding='utf8'), {'status':0})
+
+    def test_diary_log_form(self):
+        """ test that the edit form of an entry is only served to the parent of the child """
+        url = reverse('diary_log_form', kwargs={'diary_id':self.diary_log_1.diary_id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'diary_log_form.html')
+        self.assertContains(response, 'Diary Entry 1')
+        self.assertContains(response, 'id="edit_text"')
+        User.objects.create_user(username='DiaryViewOther', password='Test', email='other@email.com')
+        self.client.login(username='DiaryViewOther', password='Test')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
 class SearchView(TestCase):
     """ unit tests for the search view """
 
@@ -432,6 +503,12 @@ class SearchView(TestCase):
         session['disclaimer'] = True
         session.save()
 
+    def expected_results(self, query):
+        """ the response of a search which finds the subheading of the test """
+        snippet, highlights = make_snippet(self.sub_heading.plainText, query)
+        return {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'snippet':snippet, 'highlights':highlights, \
+        'title':self.sub_heading.title, 'heading_id':str(self.heading.headingId)}], 'status':1, 'total':1, 'page':1, 'pages':1}
+
     def test_view_page_with_user(self):
         """ test the page for the view with a logged in user """
         self.client.login(username='SearchViewTest', password='Test')
@@ -455,55 +532,35 @@ class SearchView(TestCase):
         self.client.login(username='SearchViewTest', password='Test')
         response = self.client.post(reverse('search'), {'search':self.category.categoryName})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.category.categoryName))
 
     def test_search_descrip_with_user(self):
         """ test we can search for a category description as a logged in user """
         self.client.login(username='SearchViewTest', password='Test')
         response = self.client.post(reverse('search'), {'search':self.category.description})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.category.description))
 
     def test_search_heading_user(self):
         """ test we can search for a category description as a logged in user """
         self.client.login(username='SearchViewTest', password='Test')
         response = self.client.post(reverse('search'), {'search':self.heading.text})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.heading.text))
 
     def test_search_subhead_text_user(self):
         """ test we can search for sub heading text as a logged in user """
         self.client.login(username='SearchViewTest', password='Test')
         response = self.client.post(reverse('search'), {'search':self.sub_heading.text})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.sub_heading.text))
 
     def test_search_subhead_title_user(self):
         """ test we can search for sub heading title as a logged in user """
         self.client.login(username='SearchViewTest', password='Test')
         response = self.client.post(reverse('search'), {'search':self.sub_heading.title})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.sub_heading.title))
 
     def test_search_cat_age_range(self):
         """ test we can search for a category as a one time user """
@@ -512,11 +569,7 @@ class SearchView(TestCase):
         session.save()
         response = self.client.post(reverse('search'), {'search':self.category.categoryName})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.category.categoryName))
 
     def test_search_descript_age_range(self):
         """ test we can search for a category description as a one time user """
@@ -525,11 +578,7 @@ class SearchView(TestCase):
         session.save()
         response = self.client.post(reverse('search'), {'search':self.category.description})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.category.description))
 
     def test_search_heading_age_range(self):
         """ test we can search for a heading as a one time user """
@@ -538,11 +587,7 @@ class SearchView(TestCase):
         session.save()
         response = self.client.post(reverse('search'), {'search':self.heading.text})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.heading.text))
 
     def test_search_subhead_text_age(self):
         """ test we can search for a sub heading text as a one time user """
@@ -551,11 +596,7 @@ class SearchView(TestCase):
         session.save()
         response = self.client.post(reverse('search'), {'search':self.sub_heading.text})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.sub_heading.text))
 
     def test_search_subhead_title_age(self):
         """ test we can search for a sub heading title as a one time user """
@@ -564,11 +605,98 @@ class SearchView(TestCase):
         session.save()
         response = self.client.post(reverse('search'), {'search':self.sub_heading.title})
         self.assertEqual(response.status_code, 200)
-        self.assertJSONEqual(
-            str(response.content, encoding='utf8'),
-            {'data': [{'sub_heading_id':str(self.sub_heading.subHeadingId), 'text':self.sub_heading.text, 'title':self.sub_heading.title, \
-            'heading_id':str(self.heading.headingId)}], 'status':1}
-        )
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.sub_heading.title))
+
+    def test_search_no_query(self):
+        """ test that the first search of a worker with a cold cache loads the content in the four
+        queries of load_rows, and that later searches are answered from the snapshot without any query """
+        cache.clear()
+        content._SNAPSHOTS.clear() # pylint: disable=W0212
+        session = self.client.session
+        session['age_range'] = 0
+        session[REFRESHED_SESSION_KEY] = int(time.time())
+        session.save()
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('search'), {'search':self.heading.text})
+        self.assertEqual(200, response.status_code)
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('search'), {'search':self.sub_heading.title})
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.sub_heading.title))
+
+    def test_search_pages(self):
+        """ test that results are returned a page at a time with a short snippet of their text """
+        for number in range(12):
+            sub_heading = SubHeading.objects.create(headingId=self.heading, title='Page %d' % number, \
+            text='<p>%s</p><p>Paging <b>test</b></p>' % ('Long text. ' * 50))
+            sub_heading.ageGroup.add(AgeGroup.objects.get(age_group=0))
+        session = self.client.session
+        session['age_range'] = 0
+        session.save()
+        response = self.client.post(reverse('search'), {'search':'paging', 'page':'2'})
+        results = response.json()
+        self.assertEqual((12, 2, 2), (results['total'], results['page'], results['pages']))
+        self.assertEqual(2, len(results['data']))
+        snippet = results['data'][0]['snippet']
+        self.assertNotIn('<', snippet)
+        self.assertLess(len(snippet), 250)
+        self.assertEqual(['Paging'], [snippet[start:end] for start, end in results['data'][0]['highlights']])
+        response = self.client.post(reverse('search'), {'search':'paging', 'page':'3'})
+        self.assertEqual({'status':0}, response.json())
+
+    def test_search_pages_past_max_results(self):
+        """ test that the total counts every match and every page can be reached, not only the first MAX_RESULTS """
+        count = search_index.MAX_RESULTS + 5
+        for number in range(count):
+            sub_heading = SubHeading.objects.create(headingId=self.heading, title='Many %d' % number, text='<p>Plenty</p>')
+            sub_heading.ageGroup.add(AgeGroup.objects.get(age_group=0))
+        session = self.client.session
+        session['age_range'] = 0
+        session.save()
+        last_page = (count + search_backends.PAGE_SIZE - 1) // search_backends.PAGE_SIZE
+        results = self.client.post(reverse('search'), {'search':'plenty', 'page':str(last_page)}).json()
+        self.assertEqual((count, last_page, last_page), (results['total'], results['page'], results['pages']))
+        self.assertEqual(count - (last_page - 1) * search_backends.PAGE_SIZE, len(results['data']))
+
+    def test_search_misspelt(self):
+        """ test that a misspelt query is corrected before searching """
+        session = self.client.session
+        session['age_range'] = 0
+        session.save()
+        response = self.client.post(reverse('search'), {'search':'Serch View'})
+        results = response.json()
+        self.assertEqual('search view', results['corrected'])
+        self.assertEqual([str(self.sub_heading.subHeadingId)], [result['sub_heading_id'] for result in results['data']])
+
+    def test_search_get(self):
+        """ test that a GET search returns the same results and can be cached without the session """
+        response = self.client.get(reverse('search'), {'q':self.sub_heading.title, 'age':'0'})
+        self.assertJSONEqual(str(response.content, encoding='utf8'), self.expected_results(self.sub_heading.title))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertNotIn('sessionid', response.cookies)
+        response = self.client.get(reverse('search'), {'q':self.sub_heading.title, 'age':'0'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_search_get_etag_changes(self):
+        """ test that the ETag of a GET search changes with the content """
+        response = self.client.get(reverse('search'), {'q':'search'})
+        self.sub_heading.title = 'Changed title'
+        self.sub_heading.save()
+        response = self.client.get(reverse('search'), {'q':'search'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_suggest(self):
+        """ test that suggestions can be cached by the browser and do not use the session or the database """
+        self.client.get(reverse('search_suggest'), {'q':'sea'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('search_suggest'), {'q':'sea', 'age':'0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertFalse(response.has_header('Vary'))
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertIn(self.sub_heading.title, [suggestion['text'] for suggestion in response.json()['suggestions']])
 
 class SymptomView(TestCase):
     """ unit tests for the symptom and symptom_heading view """
@@ -591,7 +719,7 @@ class SymptomView(TestCase):
         response = self.client.get(reverse('symptom', kwargs={'symptom_name': self.category}))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'symptom.html')
-        self.assertListEqual([self.heading], list(response.context['headings']))
+        self.assertListEqual([self.heading.headingId], [heading.headingId for heading in response.context['headings']])
         self.assertEqual(self.category.description, response.context['description'])
 
     def test_view_page_age_group(self):
@@ -602,7 +730,7 @@ class SymptomView(TestCase):
         response = self.client.get(reverse('symptom', kwargs={'symptom_name': self.category}))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'symptom.html')
-        self.assertListEqual([self.heading], list(response.context['headings']))
+        self.assertListEqual([self.heading.headingId], [heading.headingId for heading in response.context['headings']])
         self.assertEqual(self.category.description, response.context['description'])
 
     def test_symptom_heading_user(self):
@@ -611,8 +739,8 @@ class SymptomView(TestCase):
         response = self.client.get(reverse('symptom_heading', kwargs={'heading_id': self.heading.headingId}))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'heading.html')
-        self.assertEqual(self.heading, response.context['heading'])
-        self.assertListEqual([self.sub_heading], list(response.context['subHeadings']))
+        self.assertEqual(self.heading.headingId, response.context['heading'].headingId)
+        self.assertListEqual([self.sub_heading.subHeadingId], [sub_heading.subHeadingId for sub_heading in response.context['subHeadings']])
 
     def test_symptom_heading_age_group(self):
         """ test all headings for a symptom are shown in the template rendered by the view as a one time user """
@@ -622,8 +750,28 @@ class SymptomView(TestCase):
         response = self.client.get(reverse('symptom_heading', kwargs={'heading_id': self.heading.headingId}))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'heading.html')
-        self.assertEqual(self.heading, response.context['heading'])
-        self.assertListEqual([self.sub_heading], list(response.context['subHeadings']))
+        self.assertEqual(self.heading.headingId, response.context['heading'].headingId)
+        self.assertListEqual([self.sub_heading.subHeadingId], [sub_heading.subHeadingId for sub_heading in response.context['subHeadings']])
+
+    def test_active_child_kept_in_session(self):
+        """ test that the active child is only looked up once and then read from the session """
+        self.client.login(username='SymptomViewTest', password='Test')
+        url = reverse('symptom_heading', kwargs={'heading_id': self.heading.headingId})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['childName'], self.child.childName)
+        self.assertFalse([query for query in queries.captured_queries if 'ipoorly_child' in query['sql'].lower()])
+
+    def test_active_child_refreshed_after_edit(self):
+        """ test that editing the active child is shown on the next page """
+        self.client.login(username='SymptomViewTest', password='Test')
+        url = reverse('symptom', kwargs={'symptom_name': self.category})
+        self.client.get(url)
+        self.child.childName = 'Renamed Child'
+        self.child.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context['childName'], 'Renamed Child')
 
 class AdminView(TestCase):
     """ unit test for the admin view """
@@ -673,6 +821,136 @@ class AdminView(TestCase):
             {'status': 1, 'id':new_category.categoryId}
         )
 
+    def test_editor_role_cached(self):
+        """ test that the editor check does not query the groups once it is kept in the session """
+        self.client.get(reverse('all_urls'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('all_urls'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if 'auth_group' in query['sql'].lower()])
+
+    def test_editor_removed(self):
+        """ test that a user removed from the Editors group loses access straight away """
+        self.client.get(reverse('admin'))
+        self.admin.groups.clear()
+        response = self.client.get(reverse('admin'))
+        self.assertRedirects(response, reverse('homepage'), fetch_redirect_response=False)
+
+@override_settings(CONTENT_AUTO_PUBLISH=False)
+class PublishView(TestCase):
+    """ unit test for the publish view """
+
+    def setUp(self):
+        cache.clear()
+        Group.objects.create(name='Editors')
+        editors_group = Group.objects.get(name='Editors')
+        self.admin = User.objects.create_user(username='PublishViewTest', password='Test', email='email@email.com')
+        self.admin.groups.add(editors_group)
+        self.client.login(username='PublishViewTest', password='Test')
+        age_group = AgeGroup.objects.create(age_group=0)
+        category = Category.objects.create(categoryName='PublishViewTest', description='This is a test for Publish View')
+        self.heading = Heading.objects.create(categoryName=category, text='This is a test for Publish View')
+        self.sub_heading = SubHeading.objects.create(headingId=self.heading, title='Published title', text='<p>Published text</p>')
+        self.sub_heading.ageGroup.add(age_group)
+        session = self.client.session
+        session['disclaimer'] = True
+        session.save()
+        # a parent who is not logged in
+        self.reader = self.client_class()
+        session = self.reader.session
+        session['disclaimer'] = True
+        session['age_range'] = 0
+        session.save()
+
+    def test_publish(self):
+        """ test that editors publish the saved content and the readers only see published content """
+        response = self.client.get(reverse('admin'))
+        self.assertTrue(response.context['publishing']['changed'])
+        self.assertContains(response, reverse('publish'))
+        response = self.client.post(reverse('publish'))
+        self.assertRedirects(response, reverse('admin'), fetch_redirect_response=False)
+        response = self.client.get(reverse('admin'))
+        self.assertFalse(response.context['publishing']['changed'])
+        self.assertEqual(self.admin, response.context['publishing']['release'].publishedBy)
+        self.sub_heading.title = 'Draft title'
+        self.sub_heading.save()
+        self.assertTrue(self.client.get(reverse('admin')).context['publishing']['changed'])
+        response = self.reader.get(reverse('symptom_heading', kwargs={'heading_id':self.heading.headingId}))
+        self.assertContains(response, 'Published title')
+        self.assertNotContains(response, 'Draft title')
+        response = self.reader.post(reverse('search'), {'search':'title'})
+        self.assertEqual('Published title', simplejson.loads(str(response.content, encoding='utf8'))['data'][0]['title'])
+        self.client.post(reverse('publish'))
+        response = self.reader.get(reverse('symptom_heading', kwargs={'heading_id':self.heading.headingId}))
+        self.assertContains(response, 'Draft title')
+
+    def test_auto_publish(self):
+        """ test that the publish button is not shown when changes are published as they are saved """
+        with self.settings(CONTENT_AUTO_PUBLISH=True):
+            response = self.client.get(reverse('admin'))
+        self.assertIsNone(response.context['publishing'])
+        self.assertNotContains(response, reverse('publish'))
+
+    def test_not_editor(self):
+        """ test that users who are not editors cannot publish """
+        self.admin.groups.clear()
+        response = self.client.post(reverse('publish'))
+        self.assertRedirects(response, reverse('homepage'), fetch_redirect_response=False)
+        self.assertFalse(ContentRelease.objects.exists())
+        response = self.client.get(reverse('admin'))
+        self.assertRedirects(response, reverse('homepage'), fetch_redirect_response=False)
+
+class AdminSymptomFormView(TestCase):
+    """ unit test for the admin_symptom_form view """
+
+    def setUp(self):
+        cache.clear()
+        Group.objects.create(name='Editors')
+        editors_group = Group.objects.get(name='Editors')
+        self.admin = User.objects.create_user(username='AdminSymptomFormViewTest', password='Test', email='email@email.com')
+        self.admin.groups.add(editors_group)
+        self.client.login(username='AdminSymptomFormViewTest', password='Test')
+        self.category = Category.objects.create(categoryName='AdminSymptomFormViewTest', description='Old description')
+
+    def test_view_page(self):
+        """ test that the form is rendered once and cached until the symptom changes """
+        url = reverse('admin_symptom_form', kwargs={'symptom_id':self.category.categoryId})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin_symptom_form.html')
+        self.assertContains(response, 'Old description')
+        self.assertContains(response, 'id="edit_description"')
+        response = self.client.get(url)
+        self.assertTemplateNotUsed(response, 'admin_symptom_form.html')
+        self.assertContains(response, 'Old description')
+        self.category.description = 'New description'
+        self.category.save()
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'admin_symptom_form.html')
+        self.assertContains(response, 'New description')
+
+    def test_admin_page(self):
+        """ test that the admin page does not render the edit forms """
+        session = self.client.session
+        session['disclaimer'] = True
+        session.save()
+        response = self.client.get(reverse('admin'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('admin_symptom_form', kwargs={'symptom_id':self.category.categoryId}))
+        self.assertTemplateNotUsed(response, 'admin_symptom_form.html')
+        self.assertNotContains(response, 'Old description')
+
+    def test_incorrect_category(self):
+        """ test the form of a symptom that does not exist """
+        response = self.client.get(reverse('admin_symptom_form', kwargs={'symptom_id':0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_editor(self):
+        """ test that users who are not editors are redirected """
+        self.admin.groups.clear()
+        response = self.client.get(reverse('admin_symptom_form', kwargs={'symptom_id':self.category.categoryId}))
+        self.assertRedirects(response, reverse('homepage'), fetch_redirect_response=False)
+
 class AdminSymptomView(TestCase):
     """ unit test for the admin_symptom view """
 
@@ -697,6 +975,7 @@ class AdminSymptomView(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(self.sub_heading, response.context['results'][0][1])
         self.assertEqual(self.heading, response.context['results'][0][0])
+        self.assertEqual([(self.heading, [1, 0, 0, 0, 0, 0])], response.context['coverage'])
         self.assertTemplateUsed(response, 'admin_symptom.html')
 
     def test_incorrect_category(self):
@@ -873,3 +1152,132 @@ class AllURLView(TestCase):
         response = self.client.get(reverse('all_urls'))
         self.assertEqual(response.status_code, 200)
         self.assertJSONEqual(str(response.content, encoding='utf8'), expected_response)
+
+class DefinedLinksView(TestCase):
+    """ unit test for the defined_links view """
+
+    def setUp(self):
+        Group.objects.create(name='Editors')
+        editors_group = Group.objects.get(name='Editors')
+        self.admin = User.objects.create_user(username='DefinedLinksViewTest', password='Test', email='email@email.com')
+        self.admin.groups.add(editors_group)
+        self.client.login(username='DefinedLinksViewTest', password='Test')
+        self.category = Category.objects.create(categoryName='DefinedLinksViewTest', description='This is a test for Defined Links View')
+
+    def test_get_links(self):
+        """ test that the links start with the placeholder and are checked with the ETag """
+        response = self.client.get(reverse('defined_links'))
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(str(response.content, encoding='utf8'), [{'name':'Select...', 'url':False}, \
+        {'name':'Symptom: ' + str(self.category), 'url':self.category.get_absolute_url()}])
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(reverse('defined_links'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_gzip(self):
+        """ test that the links are gzipped when the browser accepts it """
+        response = self.client.get(reverse('defined_links'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(self.category.get_absolute_url(), gzip.decompress(response.content).decode('utf-8'))
+        etag = response['ETag']
+        response = self.client.get(reverse('defined_links'))
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test_etag_changes(self):
+        """ test that the links are downloaded again after the content changed """
+        etag = self.client.get(reverse('defined_links'))['ETag']
+        Category.objects.create(categoryName='DefinedLinksViewTest2', description='Another symptom')
+        response = self.client.get(reverse('defined_links'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/symptom/definedlinksviewtest2')
+
+class ReadyView(TestCase):
+    """ unit test for the ready view """
+
+    def setUp(self):
+        # pylint: disable=W0212
+        warmup._READY.clear()
+
+    def test_ready(self):
+        """ test that the view reports whether the caches were warmed """
+        response = self.client.get(reverse('ready'))
+        self.assertEqual(response.status_code, 200)
+        with self.settings(WARM_CACHES_ON_BOOT=True):
+            response = self.client.get(reverse('ready'))
+            self.assertEqual(response.status_code, 503)
+            self.assertJSONEqual(str(response.content, encoding='utf8'), {'status':0})
+            warmup.warm()
+            response = self.client.get(reverse('ready'))
+            self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+class SessionRefresh(TestCase):
+    """ unit tests for the throttled session writes """
+
+    def setUp(self):
+        AgeGroup.objects.create(age_group=0)
+        session = self.client.session
+        session['disclaimer'] = True
+        session['age_range'] = 0
+        session.save()
+        self.session_key = session.session_key
+
+    def expire_date(self):
+        """ the expiry of the session stored in the database """
+        return Session.objects.get(session_key=self.session_key).expire_date
+
+    def test_unchanged_session_not_written(self):
+        """ test that a page which does not change the session only writes it once per interval """
+        self.client.get(reverse('homepage'))
+        expire_date = self.expire_date()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('homepage'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if 'django_session' in query['sql']])
+        self.assertEqual(expire_date, self.expire_date())
+
+    @override_settings(SESSION_REFRESH_INTERVAL=0)
+    def test_session_written_after_interval(self):
+        """ test that the expiry of the session slides once the interval has passed """
+        self.client.get(reverse('homepage'))
+        expire_date = self.expire_date()
+        self.client.get(reverse('homepage'))
+        self.assertGreater(self.expire_date(), expire_date)
+
+    @override_settings(SESSION_COOKIE_AGE=20*60, SESSION_REFRESH_INTERVAL=5*60)
+    def test_session_kept_for_interval(self):
+        """ test that the session is kept for the refresh interval on top of the cookie age """
+        self.assertEqual(self.client.session.get_expiry_age(), 25*60)
+
+class CookieSession(TestCase):
+    """ unit tests for sessions of anonymous users kept in a cookie """
+
+    def setUp(self):
+        User.objects.create_user(username='CookieSessionTest', password='Test', email='email@email.com')
+        AgeGroup.objects.create(age_group=0)
+
+    def test_anonymous_session_not_stored(self):
+        """ test that a one time user who reads the disclaimer and picks an age has no stored session """
+        self.client.post(reverse('disclaimer'))
+        response = self.client.post(reverse('age'), {'age':0}, follow=True)
+        self.assertTemplateUsed(response, 'homepage.html')
+        response = self.client.get(reverse('homepage'))
+        self.assertTemplateUsed(response, 'homepage.html')
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_session_stored_after_login(self):
+        """ test that the session is moved to the database when the user logs in and keeps its data """
+        self.client.post(reverse('disclaimer'))
+        self.client.post(reverse('age'), {'age':0})
+        self.client.post(reverse('user_login'), {'username':'CookieSessionTest', 'password':'Test'})
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertTrue(self.client.session['disclaimer'])
+
+    def test_tampered_cookie(self):
+        """ test that a cookie session with a bad signature is thrown away """
+        self.client.post(reverse('disclaimer'))
+        self.client.cookies['sessionid'] = 'x' + self.client.cookies['sessionid'].value
+        response = self.client.get(reverse('homepage'))
+        self.assertRedirects(response, reverse('disclaimer'), fetch_redirect_response=False)
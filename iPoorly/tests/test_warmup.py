@@ -0,0 +1,84 @@
+""" Unit tests for warmup.py and the warm_caches command """
+from io import StringIO
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from iPoorly.models import Category, Heading, SubHeading, AgeGroup
+from iPoorly import warmup, search_index, suggest, fuzzy, links
+from iPoorly.content import get_snapshot
+
+class WarmUpTest(TestCase):
+    """ unit tests for filling the caches """
+
+    def setUp(self):
+        # pylint: disable=W0212
+        warmup._READY.clear()
+        age_group = AgeGroup.objects.create(age_group=0)
+        category = Category.objects.create(categoryName='Fever', description='Hot')
+        heading = Heading.objects.create(categoryName=category, text='High temperature')
+        sub_heading = SubHeading.objects.create(headingId=heading, title='Call 111', text='<p>Call 111</p>')
+        sub_heading.ageGroup.add(age_group)
+
+    def test_warm(self):
+        """ test that every task is run and reported and nothing is loaded again afterwards """
+        lines = []
+        timings = warmup.warm(workers=2, report=lines.append)
+        names = [name for name, _ in timings]
+        self.assertEqual(['content', 'saved content'], names[:2])
+        self.assertEqual(6 + len(AgeGroup.CHOICES), len(names))
+        self.assertIn('searches for less than 1 month', names)
+        self.assertEqual(len(names), len(lines))
+        self.assertTrue(lines[-1].startswith('Warmed the caches in'))
+        with self.assertNumQueries(0):
+            get_snapshot()
+            search_index.get_index()
+            suggest.get_suggestions()
+            fuzzy.get_vocabulary()
+            links.get_links()
+
+    @override_settings(WARM_SEARCH_QUERIES=['temperature'])
+    def test_search_queries(self):
+        """ test that the symptom names and the extra queries are searched """
+        self.assertEqual(['Fever', 'temperature'], warmup.search_queries(get_snapshot()))
+
+    def test_ready(self):
+        """ test that a worker is only ready once it is warm, if it warms up on boot """
+        self.assertTrue(warmup.is_ready())
+        with self.settings(WARM_CACHES_ON_BOOT=True):
+            self.assertFalse(warmup.is_ready())
+            warmup.warm()
+            self.assertTrue(warmup.is_ready())
+
+    def test_warm_on_boot_retries(self):
+        """ test that a failed warm up is tried again and that the worker is ready if it never succeeds """
+        failures = []
+        calls = []
+        real_warm = warmup.warm
+        def failing_warm(report=None):
+            """ a warm up which fails the first time """
+            calls.append(report)
+            if len(calls) == 1:
+                raise RuntimeError('the database is not up yet')
+            return real_warm(report=report)
+        with self.settings(WARM_CACHES_ON_BOOT=True), mock.patch.object(warmup, 'warm', failing_warm):
+            self.assertTrue(warmup.warm_on_boot(report_failure=failures.append, delay=0))
+            self.assertTrue(warmup.is_ready())
+        self.assertEqual(2, len(calls))
+        self.assertEqual(['Warming the caches failed (attempt 1 of 3)'], failures)
+
+    def test_warm_on_boot_gives_up(self):
+        """ test that a worker which cannot warm up is marked ready and loads the content lazily """
+        def failing_warm(report=None):
+            # pylint: disable=W0613
+            """ a warm up which always fails """
+            raise RuntimeError('the database is down')
+        with self.settings(WARM_CACHES_ON_BOOT=True), mock.patch.object(warmup, 'warm', failing_warm):
+            self.assertFalse(warmup.warm_on_boot(attempts=2, delay=0))
+            self.assertTrue(warmup.is_ready())
+
+    def test_command(self):
+        """ test that the command reports the progress """
+        out = StringIO()
+        call_command('warm_caches', '--workers', '1', stdout=out)
+        self.assertIn('content: ', out.getvalue())
+        self.assertIn('(%d/%d)' % (4 + len(AgeGroup.CHOICES), 4 + len(AgeGroup.CHOICES)), out.getvalue())
@@ -0,0 +1,20 @@
+""" Helpers for the text of the content, which is HTML written with the Redactor editor. Kept apart
+from the search modules so that models.py can use them """
+import re
+from html import unescape
+from django.utils.html import strip_tags
+from unidecode import unidecode
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_BLOCK_END_RE = re.compile(r'<(br|/p|/li|/h\d|/div)\b[^>]*>', re.IGNORECASE)
+
+def tokenize(text):
+    """ split HTML or plain text into lower case ascii words """
+    return _WORD_RE.findall(unidecode(unescape(strip_tags(text or ''))).lower())
+
+def html_to_text(html):
+    """ the text of some HTML without the tags and entities, with single spaces """
+    # keep the words of two paragraphs or list items apart
+    html = _BLOCK_END_RE.sub(' ', html or '')
+    return _WHITESPACE_RE.sub(' ', unescape(strip_tags(html))).strip()
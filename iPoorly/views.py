@@ -1,27 +1,29 @@
 """ The main part of the backend server """
-from datetime import date
 import platform
-from django.shortcuts import render, redirect
+import simplejson
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.contrib.auth import login
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_GET, condition
+from django.views.decorators.cache import cache_control, never_cache
+from django.utils.cache import patch_vary_headers
 from django.db import IntegrityError
 from django.contrib.auth.models import Group
-from django.db.models import Q
-from django.core.cache import cache
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.urls import reverse
-from django.contrib.sites.shortcuts import get_current_site
+from django.template.loader import render_to_string
 from decouple import config
-from requests import post as make_post_call
-from requests import ConnectionError as RequestsConnectionError
 from .models import Child, Category, Heading, SubHeading, DiaryLog, AgeGroup
 from .forms import LoginForm, SignUpForm, AddChildForm, EditChildForm, SubHeadingEditForm, HeadingEditForm, CategoryEditForm, SearchForm,\
 DiaryLogEditForm, ForgotPassword
 from .decorators import disclaimer_required, admin_required, age_required
+from . import services, ages, search_backends, suggest, fuzzy, editor, links, warmup
+from .content import get_snapshot, current_version
+from .snippets import make_snippet
+from .diary import diary_page
 
 def index(request):
     """ the index page is the first page the user sees """
@@ -38,28 +40,45 @@ def index(request):
         'name':name,
     })
 
+@never_cache
+def ready(request):
+    # pylint: disable=W0613
+    """ whether this worker has filled its caches and can serve traffic, for the load balancer """
+    if not warmup.is_ready():
+        return JsonResponse({'status':0}, status=503)
+    return JsonResponse({'status':1})
+
 @login_required
 @admin_required
 def all_urls(request):
     # pylint: disable=W0613
     """ return all the urls for the models so that admin can use them for hyperlinks in articles """
-    results = cache.get("all_urls")
-    if results is None:
-        categories = Category.objects.all()
-        headings = Heading.objects.all()
-        sub_headings = SubHeading.objects.all()
-        results = []
-        for category in categories:
-            url_info = {'name':'Symptom: ' + str(category), 'url': category.get_absolute_url()}
-            results.append(url_info)
-        for heading in headings:
-            url_info = {'name':'Heading: ' + str(heading), 'url': heading.get_absolute_url()}
-            results.append(url_info)
-        for sub_heading in sub_headings:
-            url_info = {'name':'Sub Heading: ' + str(sub_heading), 'url': sub_heading.get_absolute_url()}
-            results.append(url_info)
-        cache.set("all_urls", results, 60*15)
-    return JsonResponse(results, safe=False)
+    return JsonResponse(links.get_links().links, safe=False)
+
+def accepts_gzip(request):
+    """ whether the browser accepts gzipped responses """
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+def defined_links_etag(request):
+    """ the ETag of the defined links, changes when the content changes """
+    return '%s-%s' % (links.get_links().etag, 'gzip' if accepts_gzip(request) else 'identity')
+
+@require_GET
+@login_required
+@admin_required
+@condition(etag_func=defined_links_etag)
+@cache_control(private=True, no_cache=True)
+def defined_links(request):
+    """ the links listed by the defined links plugin of the Redactor editor. The browser checks the
+    ETag on each load and only downloads the links again after the content changed """
+    index = links.get_links()
+    if accepts_gzip(request):
+        response = HttpResponse(index.gzipped, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(index.body, content_type='application/json')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
 
 @login_required
 @disclaimer_required
@@ -79,15 +98,30 @@ def admin(request):
         if form.is_valid():
             form.save()
         return redirect('admin')
-    symptoms_form = []
-    for cat in categories:
-        symptoms_form.append({"form":CategoryEditForm(instance=cat), "id":cat.categoryId})
     return render(request, 'admin.html', {
         'categories':categories,
         'form':form,
-        'edit_symptoms':symptoms_form,
+        'publishing':editor.publish_status(),
     })
 
+@require_POST
+@login_required
+@admin_required
+def publish(request):
+    """ show the content as saved by the editors to the readers. The workers load the new release
+    on their next request """
+    services.publish_content(request.user)
+    return redirect('admin')
+
+@require_GET
+@login_required
+@admin_required
+def admin_symptom_form(request, symptom_id):
+    # pylint: disable=W0613
+    """ the fields of the form editing one symptom, fetched by the admin page when the symptom is edited """
+    category = get_object_or_404(Category, categoryId=symptom_id)
+    return HttpResponse(editor.render_category_form(category))
+
 @require_POST
 @admin_required
 def symptom_delete(request):
@@ -111,14 +145,15 @@ def admin_symptom(request, symptom_name):
                 raise ValueError
         except ValueError:
             return redirect('admin')
-    results = []
-    headings = Heading.objects.filter(categoryName=category)
-    for heading in headings:
-        sub_headings = SubHeading.objects.filter(headingId=heading)
-        results.append((heading, sub_headings))
+    headings = editor.load_category_tree(category)
+    results = [(heading, heading.sub_headings) for heading in headings]
+    coverage, coverage_totals = editor.coverage_grid(headings)
     return render(request, 'admin_symptom.html', {
         'category':category,
         'results':results,
+        'age_groups':[name for _, name in AgeGroup.CHOICES],
+        'coverage':coverage,
+        'coverage_totals':coverage_totals,
     })
 
 @login_required
@@ -317,15 +352,15 @@ def forgot_password(request):
 @age_required
 def homepage(request):
     """ the main home page after login or login skipped with age selected """
-    symptoms = Category.objects.all()
+    symptoms = get_snapshot().categories
     child_name = None
     child_age = None
     select_age = None
     if request.user.is_authenticated:
-        child = Child.objects.filter(Q(username=request.user) & Q(activate=True))
+        child = request.active_child
         if child:
-            child_name = child[0].childName
-            child_age = get_age_string(child[0])
+            child_name = child.name
+            child_age = child.age_string
         else:
             return redirect('myChild')
     if request.session.has_key('age_range'):
@@ -339,17 +374,11 @@ def homepage(request):
 
 def get_age_string(child_object):
     """ get a childs age in terms of months or years and months """
-    child_age = child_object.dob
-    child_months = ((date.today().year - child_age.year)*12) + (date.today().month - child_age.month)
-    if child_months < 25:
-        return str(child_months) + " months"
-    years = round(child_months/12)
-    month = child_months % 12
-    return str(years) + " years and " + str(month) + " months"
+    return ages.get_age_string(child_object.dob)
 
 def age_group_to_string(age_group):
     """ returns the string representation of an age group object """
-    return str(AgeGroup.objects.get(age_group=age_group))
+    return ages.age_group_to_string(age_group)
 
 
 @disclaimer_required
@@ -388,25 +417,20 @@ def disclaimer(request):
 def symptom(request, symptom_name):
     """ the page produced for a symptom. Shows all the headings for that symptom """
     symptom_name = symptom_name.lower()
-    headings = cache.get(symptom_name)
-    description = cache.get(symptom_name + "_description")
-    if description is None:
-        category = Category.objects.filter(categoryName=symptom_name).first()
-        description = None
-        if category:
-            description = category.description
-            cache.set(symptom_name + "_description", description, 60*15)
-    if headings is None:
-        headings = Heading.objects.filter(categoryName=category)
-        cache.set(symptom_name, headings, 60*15)
+    category = get_snapshot().category(symptom_name)
+    description = None
+    headings = ()
+    if category:
+        description = category.description
+        headings = category.headings
     child_name = None
     child_age = None
     select_age = None
     if request.user.is_authenticated:
-        child = Child.objects.filter(Q(username=request.user) & Q(activate=True))
+        child = request.active_child
         if child:
-            child_name = child[0].childName
-            child_age = get_age_string(child[0])
+            child_name = child.name
+            child_age = child.age_string
         else:
             return redirect('myChild')
     if request.session.has_key('age_range'):
@@ -424,27 +448,25 @@ def symptom(request, symptom_name):
 @age_required
 def symptom_heading(request, heading_id):
     """ shows all the subheadings for a heading of a symptom """
-    heading = Heading.objects.filter(headingId=heading_id).first()
+    snapshot = get_snapshot()
+    heading = snapshot.heading(heading_id)
     if request.user.is_authenticated:
         age_group = get_age_group(request)
-        if age_group == 10:
+        if age_group == ages.NO_AGE_GROUP:
             return redirect('myChild')
     elif request.session.has_key('age_range'):
         age_group = request.session['age_range']
     else:
         age_group = 0
-    sub_headings = cache.get(str(heading_id) + "_" + str(age_group))
-    if sub_headings is None:
-        sub_headings = SubHeading.objects.filter(Q(headingId=heading) & Q(ageGroup__age_group=age_group))
-        cache.set(str(heading_id) + "_" + str(age_group), sub_headings, 60*15)
+    sub_headings = snapshot.sub_headings_for(heading_id, age_group)
     child_name = None
     child_age = None
     select_age = None
     if request.user.is_authenticated:
-        child = Child.objects.filter(Q(username=request.user) & Q(activate=True))
+        child = request.active_child
         if child:
-            child_name = child[0].childName
-            child_age = get_age_string(child[0])
+            child_name = child.name
+            child_age = child.age_string
         else:
             return redirect('myChild')
     if request.session.has_key('age_range'):
@@ -469,13 +491,7 @@ def my_child(request):
             if child_form.is_valid():
                 child_name = child_form.cleaned_data['childName']
                 dob = child_form.cleaned_data['dob']
-                new_child = Child(username=request.user, childName=child_name, dob=dob, activate=False)
-                new_child.save()
-                try:
-                    post_url = "http://" + get_current_site(request).domain + reverse(child_activate)
-                    make_post_call(post_url, data={'id':new_child.id})
-                except RequestsConnectionError:
-                    pass
+                services.add_child(request.user, child_name, dob)
             else:
                 error = "No child above the age of 5 can be added"
 
@@ -522,15 +538,8 @@ def child_manage(request):
 def child_activate(request):
     """ make a child as active for a user so the information is shown for the seleted child """
     child_id = int(request.POST['id'])
-    child = Child.objects.filter(id=child_id).first()
-    if child.username != request.user:
+    if not services.activate_child(request.user, child_id):
         return JsonResponse({'status':0})
-    active_child = Child.objects.filter(Q(username=request.user) & Q(activate=True)).first()
-    if active_child:
-        active_child.activate = False
-        active_child.save()
-    child.activate = True
-    child.save()
     return JsonResponse({'status':1})
 
 @require_POST
@@ -538,18 +547,8 @@ def child_activate(request):
 def child_delete(request):
     """ delete a child object from the model """
     child_id = int(request.POST['id'])
-    child = Child.objects.filter(id=child_id).first()
-    if child is None:
-        return JsonResponse({'status':0})
-    if child.username != request.user:
+    if not services.delete_child(request.user, child_id):
         return JsonResponse({'status':0})
-    if child.activate:
-        child.delete()
-        new_child = Child.objects.filter(username=request.user).first()
-        new_child.activate = True
-        new_child.save()
-    else:
-        child.delete()
     return JsonResponse({'status':1})
 
 
@@ -571,68 +570,100 @@ def location_map(request):
         'api_key':api_key,
     })
 
+def search(request):
+    """ allow user to serach for some information quickly. GET /search/?q=...&age=... returns the
+    results as JSON without using the session, so they can be cached by browsers and proxies """
+    if request.method == 'GET' and 'q' in request.GET:
+        return search_get(request)
+    return search_page(request)
+
 @disclaimer_required
 @age_required
-def search(request):
-    """ allow user to serach for some information quickly """
+def search_page(request):
+    """ the search page. Results are also returned for POST requests with the age group of the user """
     if request.method == 'POST':
-        results = {}
-        query = request.POST.get('search')
-        age_group = 0
-        if request.user.is_authenticated:
-            age_group = get_age_group(request)
-            if age_group == 10:
-                age_group = 0
-        elif request.session.has_key('age_range'):
-            age_group = request.session['age_range']
-        sub_headings = cache.get(query.replace(" ", "") + "_" + str(age_group))
-        if sub_headings is None:
-            sub_headings = SubHeading.objects.filter((Q(headingId__text__icontains=query) | Q(headingId__categoryName__description__icontains=query)|\
-            Q(headingId__categoryName__categoryName__icontains=query) | Q(title__icontains=query) | Q(text__icontains=query))\
-            & Q(ageGroup__age_group=age_group)).distinct()
-            if sub_headings.count() > 0:
-                cache.set(query.replace(" ", "") + "_" + str(age_group), sub_headings, 60*15)
-        if sub_headings.count() > 0:
-            results.update({'status':1})
-            data = []
-            for sub_heading in sub_headings:
-                title = str(sub_heading.title)
-                text = str(sub_heading.text)
-                heading_id = str(sub_heading.headingId.headingId)
-                sub_heading_id = str(sub_heading.subHeadingId)
-                data_dictonary = {'title':title, 'text':text, 'heading_id':heading_id, 'sub_heading_id':sub_heading_id}
-                data.append(data_dictonary)
-            results.update({'data':data})
-        else:
-            results.update({'status':0})
-        return JsonResponse(results, safe=False)
+        results = search_response(request.POST.get('search', ''), search_age_group(request), request.POST.get('page', '1'))
+        return HttpResponse(simplejson.dumps(results), content_type='application/json')
     search_form = SearchForm()
     return render(request, 'search.html', {
         'form':search_form,
+        'age_group':search_age_group(request),
     })
 
-def get_age_group(request):
-    """ from the age of a child, get the appropriate age group or return 10 if child doesnt exsist """
-    child = Child.objects.filter(Q(username=request.user) & Q(activate=True)).first()
-    if child is None:
-        return 10
-    child_age = child.dob
-    age_of_child = ((date.today().year - child_age.year)*12) + (date.today().month - child_age.month)
-    if age_of_child <= 1:
-        age_group = 0
-    elif age_of_child < 3:
-        age_group = 1
-    elif age_of_child < 6:
-        age_group = 2
-    elif age_of_child < 12:
-        age_group = 3
-    elif age_of_child < 24:
-        age_group = 4
-    elif age_of_child <= 60:
-        age_group = 5
+def search_etag(request):
+    # pylint: disable=W0613
+    """ search results only change when the content changes """
+    return 'search-%s' % current_version()
+
+@require_GET
+@condition(etag_func=search_etag)
+@cache_control(public=True, max_age=search_backends.SEARCH_MAX_AGE)
+def search_get(request):
+    """ the search results for the query and age group in the url """
+    age_group = request.GET.get('age', '0')
+    results = search_response(request.GET.get('q', ''), int(age_group) if age_group.isdigit() else 0, request.GET.get('page', '1'))
+    response = HttpResponse(simplejson.dumps(results), content_type='application/json')
+    # the response is the same for every user, only a compressed copy may differ
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+def search_response(query, age_group, page):
+    """ the JSON data of one page of results of a search """
+    results = {}
+    corrected = fuzzy.correct(query)
+    if corrected != query:
+        results.update({'corrected':corrected})
+        query = corrected
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+    page_size = search_backends.PAGE_SIZE
+    sub_heading_ids, total = search_backends.search_page(query, age_group, page, page_size)
+    data = search_results(sub_heading_ids, query)
+    if data:
+        results.update({'status':1, 'data':data, 'total':total, 'page':page, \
+        'pages':(total + page_size - 1) // page_size})
     else:
-        age_group = 0
-    return age_group
+        results.update({'status':0})
+    return results
+
+@require_GET
+@cache_control(public=True, max_age=suggest.SUGGEST_MAX_AGE)
+def search_suggest(request):
+    """ suggestions for the search box while the user types. The age group is passed in the url
+    instead of being read from the session, so the same response can be cached for every user """
+    age_group = request.GET.get('age', '')
+    age_group = int(age_group) if age_group.isdigit() else None
+    suggestions = suggest.suggest(request.GET.get('q', ''), age_group)
+    return HttpResponse(simplejson.dumps({'suggestions':suggestions}), content_type='application/json')
+
+def search_age_group(request):
+    """ the age group searched for, from the active child or the age selected by a one time user """
+    if request.user.is_authenticated:
+        age_group = get_age_group(request)
+        if age_group == ages.NO_AGE_GROUP:
+            return 0
+        return age_group
+    return request.session.get('age_range', 0)
+
+def search_results(sub_heading_ids, query):
+    """ the JSON data of the subheadings found by a search, in the order they were found, with a
+    snippet of their text around the words of the query. Read from the content snapshot so that
+    the results show the published content, without any query """
+    snapshot = get_snapshot()
+    data = []
+    for sub_heading_id in sub_heading_ids:
+        sub_heading = snapshot.sub_heading(sub_heading_id)
+        if sub_heading is not None:
+            snippet, highlights = make_snippet(sub_heading.plainText, query)
+            data.append({'title':sub_heading.title, 'snippet':snippet, 'highlights':highlights, \
+            'heading_id':str(sub_heading.headingId.headingId), 'sub_heading_id':str(sub_heading_id)})
+    return data
+
+def get_age_group(request):
+    """ from the age of the active child, get the appropriate age group or return 10 if child doesnt exsist """
+    child = request.active_child
+    if not child:
+        return ages.NO_AGE_GROUP
+    return child.age_group
 
 @login_required
 @disclaimer_required
@@ -663,19 +694,39 @@ def diary_logs(request, child_id):
     child = Child.objects.filter(id=child_id).first()
     if child.username != request.user:
         return redirect('index')
-    logs = DiaryLog.objects.filter(child=child)
+    logs, next_page = diary_page(child)
     form = DiaryLogEditForm(initial={'child':child, 'check_id':0})
-    edit_logs = []
-    for log in logs:
-        edit_logs.append(DiaryLogEditForm(instance=log, initial={'check_id':log.diary_id}))
     return render(request, 'diary_logs.html', {
         'child':child,
         'logs':logs,
+        'next':next_page,
         'form':form,
-        'edit_logs':edit_logs,
         'error':error,
     })
 
+@require_GET
+@login_required
+def diary_logs_page(request, child_id):
+    """ the next page of the diary of a child, fetched as the parent scrolls. Returns the HTML of the
+    entries and the cursor of the page after, or None on the last page """
+    child = Child.objects.filter(id=child_id, username=request.user).first()
+    if child is None:
+        return JsonResponse({'status':0})
+    try:
+        logs, next_page = diary_page(child, request.GET.get('after'))
+    except ValueError:
+        return JsonResponse({'status':0})
+    html = render_to_string('diary_log.html', {'logs':logs}, request=request)
+    return JsonResponse({'status':1, 'html':html, 'next':next_page})
+
+@require_GET
+@login_required
+def diary_log_form(request, diary_id):
+    """ the fields of the form editing a diary entry, fetched when the entry is edited """
+    log = get_object_or_404(DiaryLog, diary_id=diary_id, child__username=request.user)
+    form = DiaryLogEditForm(instance=log, initial={'check_id':log.diary_id}, auto_id='edit_%s')
+    return render(request, 'diary_log_form.html', {'form':form})
+
 @require_POST
 @login_required
 def diary_delete(request):
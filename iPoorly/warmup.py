@@ -0,0 +1,104 @@
+""" Fills the caches after a deploy or a cache restart so that the first parents do not pay for the
+cold start. The symptom and heading pages are served from the content snapshot (see content.py),
+so loading it fills the page of every symptom and every heading at every age group at once. The
+structures built from the snapshot (the search index, the suggestions, the spelling vocabulary and
+the defined links) and the searches for each symptom name at each age group are then filled by a
+pool of threads. Run by the warm_caches command in the release phase, after the migrations, which
+fills the shared cache (the rows of the content and the postgres searches) before the release serves
+traffic, and by the gunicorn post_fork hook (see gunicorn_conf.py), which fills the memory of each
+worker with warm_on_boot(). A worker tries a few times and, if it still cannot warm up, serves
+traffic anyway and loads the content on its first requests, like a worker which does not warm up
+on boot. is_ready() tells the load balancer whether this worker is done warming up """
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connection
+from .models import AgeGroup
+from .content import get_snapshot
+from . import search_index, suggest, fuzzy, links, search_backends
+
+WORKERS = 4
+
+# how many times a worker tries to warm up on boot, and the seconds it waits before trying again,
+# doubled after each failure
+BOOT_ATTEMPTS = 3
+BOOT_RETRY_DELAY = 2
+
+_READY = threading.Event()
+
+def is_ready():
+    """ whether this process can serve traffic. Always true unless the caches are warmed on boot """
+    return _READY.is_set() or not getattr(settings, 'WARM_CACHES_ON_BOOT', False)
+
+def search_queries(snapshot):
+    """ the searches which are warmed, the name of every symptom and the WARM_SEARCH_QUERIES setting """
+    queries = [str(category) for category in snapshot.categories]
+    queries.extend(getattr(settings, 'WARM_SEARCH_QUERIES', ()))
+    return queries
+
+def _warm_search(age_group, queries):
+    """ run the searches for one age group, the first page as the search view asks for it. Only the
+    postgres results are cached, the in-memory index is as quick as the cache """
+    for query in queries:
+        search_backends.search_page(query, age_group, 1)
+
+def _timed(name, function, *args):
+    """ run a warm up task, returns (name, seconds) """
+    started = time.time()
+    function(*args)
+    return name, time.time() - started
+
+def _in_thread(name, function, *args):
+    """ run a warm up task in a thread of the pool, which has its own database connection """
+    try:
+        return _timed(name, function, *args)
+    finally:
+        connection.close()
+
+def warm(workers=WORKERS, report=None):
+    """ fill the caches. report is called with a line of text after each task. Returns the (name,
+    seconds) of each task """
+    report = report or (lambda line: None)
+    started = time.time()
+    # every other task is built from the snapshots, the links from the content as saved by the editors
+    timings = [_timed('content', get_snapshot), _timed('saved content', get_snapshot, True)]
+    report('content: %.2fs, saved content: %.2fs' % (timings[0][1], timings[1][1]))
+    tasks = [
+        ('search index', search_index.get_index, ()),
+        ('suggestions', suggest.get_suggestions, ()),
+        ('spelling', fuzzy.get_vocabulary, ()),
+        ('links', links.get_links, ()),
+    ]
+    queries = search_queries(get_snapshot())
+    for age_group, name in AgeGroup.CHOICES:
+        tasks.append(('searches for %s' % name, _warm_search, (age_group, queries)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_in_thread, name, function, *args) for name, function, args in tasks]
+        for number, future in enumerate(as_completed(futures), 1):
+            timing = future.result()
+            timings.append(timing)
+            report('%s: %.2fs (%d/%d)' % (timing + (number, len(tasks))))
+    _READY.set()
+    report('Warmed the caches in %.2fs' % (time.time() - started))
+    return timings
+
+def warm_on_boot(report=None, report_failure=None, attempts=BOOT_ATTEMPTS, delay=BOOT_RETRY_DELAY):
+    """ warm the caches of a worker before it serves requests, trying again after a failure.
+    report_failure is called with a line of text from inside the except block of each failure. If
+    every attempt fails the worker is marked ready anyway, so that a worker whose warm up failed once
+    is not kept out of the load balancer for its whole life. Returns whether the caches were warmed """
+    report_failure = report_failure or (lambda line: None)
+    for attempt in range(1, attempts + 1):
+        try:
+            warm(report=report)
+            return True
+        except Exception: # pylint: disable=W0703
+            report_failure('Warming the caches failed (attempt %d of %d)' % (attempt, attempts))
+            # the next attempt starts with a new database connection
+            connection.close()
+        if attempt < attempts:
+            time.sleep(delay)
+            delay *= 2
+    _READY.set()
+    return False
@@ -2,35 +2,103 @@ $('#search').on('submit', function(event){
     event.preventDefault();
     $('#wait').show();
     $('#results').hide();
-    get_results();
+    get_results(1);
 });
 
-function get_results(){
+$('#results').on('click', '#more', function(event){
+    event.preventDefault();
+    $(this).remove();
+    get_results($(this).data('page'));
+});
+
+function escape_html(text){
+    return $('<div>').text(text).html();
+}
+
+// the snippet of a result with the words matching the query in bold
+function highlight(snippet, highlights){
+    var html = '';
+    var position = 0;
+    for(var i = 0; i < highlights.length; i++){
+        html += escape_html(snippet.substring(position, highlights[i][0]));
+        html += '<mark>' + escape_html(snippet.substring(highlights[i][0], highlights[i][1])) + '</mark>';
+        position = highlights[i][1];
+    }
+    return html + escape_html(snippet.substring(position));
+}
+
+// suggest symptoms, headings and titles while the user types, once they stop for a moment
+var suggest_timer = null;
+$('#query').on('input', function(){
+    clearTimeout(suggest_timer);
+    var query = $(this).val();
+    if(query.trim().length < 2){
+        $('#suggestions').empty();
+        return;
+    }
+    suggest_timer = setTimeout(function(){ get_suggestions(query); }, 150);
+});
+
+function get_suggestions(query){
+    $.ajax({
+          url : "/search/suggest/", // the endpoint
+          type : "GET", // http method, the response can be cached by the browser
+          data : { q : query, age : $('#search').data('age') },
+
+          success : function(json) {
+              var options = '';
+              for(var i = 0; i < json['suggestions'].length; i++){
+                  options += $('<option>').attr('value', json['suggestions'][i]['text'])[0].outerHTML;
+              }
+              $('#suggestions').html(options);
+          }
+      });
+  }
+
+function get_results(page){
     $.ajax({
           url : "/search/", // the endpoint
-          type : "POST", // http method
-          data : { search : $('#query').val(), csrfmiddlewaretoken:$('[name=csrfmiddlewaretoken]').val() },
+          type : "GET", // http method, the results can be cached by the browser and proxies
+          data : { q : $('#query').val(), age : $('#search').data('age'), page : page },
   
           // handle a successful response
           success : function(json) {
               $('#results').val(''); // remove the value from the input
-              var result = '<br><h3>Results</h2>';
+              var result = '';
+              if(page == 1){
+                  result += '<br><h3>Results</h2>';
+              }
+              if(page == 1 && json['corrected']){
+                  result += '<p>Showing results for <i>' + escape_html(json['corrected']) + '</i></p>';
+              }
               var status = json['status'];
               if(status == 0){
                   result += '<h4>No results found.</h4>'; 
               }
               else{
+                if(page == 1){
+                    result += '<p>' + json['total'] + ' results</p>';
+                }
                 for(var i = 0; i <json['data'].length;i++){
                     var heading = json['data'][i]
-                    result += '<h4><a href="/symptom/information/'+ heading['heading_id'] + '#' + heading['sub_heading_id'] + '">' + heading['title'] + '</a></h4>' + heading['text'] + '<div class="divider"></div>'
+                    result += '<h4><a href="/symptom/information/'+ heading['heading_id'] + '#' + heading['sub_heading_id'] + '">' + escape_html(heading['title']) + '</a></h4>'
+                    result += '<p>' + highlight(heading['snippet'], heading['highlights']) + '</p><div class="divider"></div>'
+                }
+                if(json['page'] < json['pages']){
+                    result += '<br><a href="#" id="more" class="waves-effect waves-light btn" data-page="' + (json['page'] + 1) + '">More results</a>';
                 }
               }  
-              $('#results').html(result);
-              $('.truncate ul').addClass('browser-default');
-              $('.truncate ol').addClass('browser-default');    
+              if(page == 1){
+                  $('#results').html(result);
+              }
+              else{
+                  $('#results').append(result);
+              }
               $('#wait').hide();
               $('#results').show();              
-              $("html, body").animate({ scrollTop: $('#results').offset().top }, 1000);              
+              if(page == 1){
+                  $("html, body").animate({ scrollTop: $('#results').offset().top }, 1000);
+              }
               
           },
   
@@ -40,4 +108,5 @@ function get_results(){
                   " <a href='#' class='close'>&times;</a></div>"); // add the error to the dom
           }
       });
-  }
\ No newline at end of file
+  }
+